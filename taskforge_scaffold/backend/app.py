@@ -1,12 +1,31 @@
-from flask import Flask, jsonify, request
+import time
+_import_started = time.perf_counter() # Cold start: the "import" phase is timed from here
+
+from flask import Flask, Response, g, jsonify, request, send_file
 from flask_cors import CORS 
-from parsers import parse_transcript 
-from llm_agent import extract_tasks_from_transcript
-import re # Import regex for de-duplication cleaning
-from pydantic import BaseModel, Field, ValidationError, field_validator # Import Pydantic components
+from parsers import parse_upload, parse_upload_bytes
+from llm_agent import LLM_PROVIDER, split_files, stream_tasks_from_chunks, extraction_cache, prompt_budget
+from llm_pool import LLMConfigurationError, get_llm_client
+from utils import dedupe_tasks # Shared with llm_agent for merging chunked extractions
+from jobs import JobQueue, JOB_FAILED
+from assignees import AssigneeResolver
+from sessions import SessionStore
+from task_store import TaskStore
+from log_config import configure_logging
+import metrics
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator # Import Pydantic components
 from typing import List, Literal, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import io
+import json
+import logging
+import multiprocessing
 import os # Import os for environment variables
 
+# Leveled logging through a queue listener (LOG_LEVEL), set up before anything logs
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Determine the correct static folder path relative to this app.py file
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 STATIC_FOLDER = os.path.join(APP_ROOT, '..', 'frontend', 'build')
@@ -21,14 +40,51 @@ CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ORIGINS')
 if CORS_ALLOWED_ORIGINS:
     origins = [origin.strip() for origin in CORS_ALLOWED_ORIGINS.split(',')]
     CORS(app, resources={r"/api/*": {"origins": origins}})
-    print(f"CORS configured for origins: {origins}")
+    logger.info("CORS configured for origins: %s", origins)
 else:
     CORS(app) # Default to all origins if not specified (OK for dev, review for prod)
-    print("CORS_ORIGINS not set, allowing all origins (defaulting for dev). Set CORS_ORIGINS for production.")
+    logger.warning("CORS_ORIGINS not set, allowing all origins (defaulting for dev). Set CORS_ORIGINS for production.")
 
 # Set max file size (e.g., 10 MB)
 MAX_FILE_SIZE_MB = 10
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE_MB * 1024 * 1024
+# The export endpoint receives the whole task board as JSON, so it gets its own limit
+EXPORT_MAX_BODY_MB = int(os.environ.get('EXPORT_MAX_BODY_MB', 64))
+
+# --- Team Database ---
+# SQLite database holding the `people` table from schema.sql. Extracted assignees are matched
+# against it (exact alias/name, then fuzzy) when the file exists.
+DB_PATH = os.environ.get('TASKFORGE_DB', os.path.join(APP_ROOT, 'taskforge.db'))
+assignee_resolver = AssigneeResolver(DB_PATH)
+
+# --- Task Store ---
+# Every extraction is saved as a meeting with its tasks in the same database, so open tasks
+# can be searched across meetings (/api/tasks, /api/meetings). Set STORE_TASKS=False to disable.
+STORE_TASKS = os.environ.get('STORE_TASKS', 'True').lower() == 'true'
+task_store = TaskStore(DB_PATH)
+
+# --- Upload Parsing Pool ---
+# Multi-file uploads are parsed concurrently. PARSE_POOL=process moves parsing into worker
+# processes, which helps CPU-bound PDF parsing at the cost of copying each upload once.
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', 4))
+PARSE_POOL = os.environ.get('PARSE_POOL', 'thread').lower()
+
+# --- Background Job Queue ---
+# Uploads made with ?async=1 return a job id right away; extraction runs on this pool.
+# Each gunicorn worker process has its own queue, so pollers must reach the same worker
+# (run a single worker with threads, or use sticky sessions).
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_RESULT_TTL_SECONDS = int(os.environ.get('JOB_RESULT_TTL_SECONDS', 3600))
+job_queue = JobQueue(max_workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL_SECONDS)
+
+# --- Re-analyze Sessions ---
+# Parsed uploads and per-segment extraction results, kept in worker memory for re-analyze.
+# Every upload creates one, so SESSION_MAX_CHARS bounds the transcript text held per worker
+# (about a byte per character for ASCII text, up to four for other scripts).
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 3600))
+SESSION_MAX_COUNT = int(os.environ.get('SESSION_MAX_COUNT', 200))
+SESSION_MAX_CHARS = int(os.environ.get('SESSION_MAX_CHARS', 50_000_000))
+session_store = SessionStore(ttl=SESSION_TTL_SECONDS, max_sessions=SESSION_MAX_COUNT, max_chars=SESSION_MAX_CHARS)
 
 # --- Pydantic Model Definition ---
 # Define the structure we expect for each task from the LLM
@@ -52,100 +108,118 @@ class TaskModel(BaseModel):
     #         # raise ValueError('dueDate must be YYYY-MM-DD or TBD') 
     #     return v
 
-def normalize_task_item(item_text):
-    """Helper function to normalize task item text for de-duplication."""
-    if not item_text:
-        return ""
-    # Lowercase, remove punctuation (except maybe hyphens if needed), collapse whitespace
-    text = item_text.lower()
-    text = re.sub(r'[^\w\s-]', '', text) # Keep word chars, whitespace, hyphen
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+# Validates a whole extraction in one call into pydantic-core instead of one call per task
+TaskListAdapter = TypeAdapter(List[TaskModel])
 
-@app.route('/api/upload', methods=['POST'])
-def upload_file():
-    # Use getlist to handle multiple files with the same key 'file'
-    files = request.files.getlist('file')
+def validate_tasks(raw_tasks):
+    """
+    Validates a list of raw task dicts against TaskModel in a single batch.
+    Returns (validated_tasks, validation_errors): the valid tasks as dicts (defaults filled in),
+    and one message per invalid task in the existing "Task N: [...]" format.
+    """
+    try:
+        return TaskListAdapter.dump_python(TaskListAdapter.validate_python(raw_tasks)), []
+    except ValidationError as e:
+        errors_by_index = {}
+        for error in e.errors():
+            index = error['loc'][0] if error['loc'] else None
+            if not isinstance(index, int):
+                raise # Not a per-item error (e.g. raw_tasks is not a list)
+            error['loc'] = error['loc'][1:]
+            errors_by_index.setdefault(index, []).append(error)
 
-    if not files or all(f.filename == '' for f in files):
-        return jsonify(error="No selected file(s)"), 400
+    for index, errors in errors_by_index.items():
+        logger.warning("Validation Error for task #%d: %s. Data: %s", index, errors, raw_tasks[index])
+    # Second batch pass over the items that had no errors
+    valid_tasks = [task for index, task in enumerate(raw_tasks) if index not in errors_by_index]
+    validated_tasks = TaskListAdapter.dump_python(TaskListAdapter.validate_python(valid_tasks))
+    validation_errors = [f"Task {index + 1}: {errors}" for index, errors in sorted(errors_by_index.items())]
+    return validated_tasks, validation_errors
 
-    all_transcript_text = ""
-    processed_files_count = 0
-    skipped_files = []
+_parse_process_pool = None
 
-    # Process each uploaded file
-    for file in files:
-        if file and file.filename != '':
-            try:
-                print(f"Processing file: {file.filename}, content-type: {file.content_type}")
-                # parse_transcript now handles different types and raises ValueError on failure/unsupported
-                transcript_text = parse_transcript(file)
-                all_transcript_text += f"\n\n--- Transcript from: {file.filename} ---\n\n" + transcript_text
-                processed_files_count += 1
-                print(f"Successfully parsed and appended: {file.filename}")
-            except ValueError as e: # Catch specific parsing/type errors from parser
-                print(f"Skipping file {file.filename} due to parsing error: {e}")
-                skipped_files.append(file.filename + f" (Skipped: {e})")
-            except Exception as e: # Catch other unexpected errors during file processing
-                print(f"Unexpected error processing file {file.filename}: {e}")
-                skipped_files.append(file.filename + f" (Unexpected Error: {e})")
-                # Continue processing other files
+def _get_parse_process_pool():
+    # Created on first use, per gunicorn worker. Parse processes are started from a clean
+    # forkserver (spawn where unavailable), never forked from this threaded worker, whose
+    # locks another thread may be holding at fork time.
+    global _parse_process_pool
+    if _parse_process_pool is None:
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _parse_process_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                                  mp_context=multiprocessing.get_context(start_method))
+    return _parse_process_pool
 
-    # Check if any files were successfully processed
-    if processed_files_count == 0:
-         error_message = "No processable files (.txt, .vtt, .srt) were found or all failed during parsing."
-         if skipped_files:
-             error_message += " Skipped files: " + ", ".join(skipped_files)
-         return jsonify(error=error_message), 400
+def parse_uploaded_files(files):
+    """
+    Parses each uploaded file.
+    Files are parsed concurrently on a pool of PARSE_WORKERS; results are kept in upload order.
+    Returns (processed_files_count, skipped_files, parsed_files), where parsed_files is a list
+    of (filename, transcript_text) in upload order.
+    """
+    files = [file for file in files if file and file.filename != '']
 
-    print(f"Combined text from {processed_files_count} file(s) for LLM processing.")
+    if PARSE_POOL == 'process' and len(files) > 1:
+        pool = _get_parse_process_pool()
+        futures = [pool.submit(parse_upload_bytes, file.filename, file.content_type, file.read()) for file in files]
+        results = [future.result() for future in futures]
+    elif len(files) > 1 and PARSE_WORKERS > 1:
+        with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(files))) as executor:
+            results = list(executor.map(parse_upload, files))
+    else:
+        results = [parse_upload(file) for file in files]
+
+    skipped_files = []
+    parsed_files = []
+    for filename, transcript_text, skip_reason in results:
+        if skip_reason is not None:
+            skipped_files.append(filename + f" ({skip_reason})")
+            continue
+        parsed_files.append((filename, transcript_text))
 
+    return len(parsed_files), skipped_files, parsed_files
+
+def process_extraction(extract, skipped_files):
+    """
+    Calls extract() for the raw LLM task list, then validates and de-duplicates it.
+    Returns (payload, status_code); shared by uploads, background jobs and re-analyze.
+    """
     # Process the combined text with the LLM
     try:
-        print("Attempting to extract tasks using LLM...")
-        extracted_tasks_raw = extract_tasks_from_transcript(all_transcript_text)
+        logger.info("Attempting to extract tasks using LLM...")
+        extracted_tasks_raw = extract()
         
-        validated_tasks = []
         validation_errors = []
+        chunk_notes = []
 
         if extracted_tasks_raw and isinstance(extracted_tasks_raw, list):
             # Check for the specific error structure returned by llm_agent on API key or other critical errors
             if len(extracted_tasks_raw) == 1 and extracted_tasks_raw[0].get("status") == "Error":
-                print(f"LLM agent returned a critical error: {extracted_tasks_raw[0]}")
+                logger.error("LLM agent returned a critical error: %s", extracted_tasks_raw[0])
                 tasks_to_return = extracted_tasks_raw # Pass the error task directly
             else:
-                # Validate each task object using Pydantic
-                for i, task_data in enumerate(extracted_tasks_raw):
-                    try:
-                        # Add default confidence if missing before validation (alternative to Optional field)
-                        # task_data.setdefault('confidence', 'Medium') 
-                        validated_task = TaskModel.model_validate(task_data)
-                        # .model_dump() includes fields with defaults even if not in input
-                        validated_tasks.append(validated_task.model_dump()) 
-                    except ValidationError as e:
-                        print(f"Validation Error for task #{i}: {e}. Data: {task_data}")
-                        validation_errors.append(f"Task {i+1}: {e.errors()}") 
-                
-                print(f"Successfully validated {len(validated_tasks)} tasks out of {len(extracted_tasks_raw)} received from LLM.")
+                # Notes about failed chunks (llm_agent.merge_chunk_results) are reported, not validated
+                chunk_notes = [task for task in extracted_tasks_raw if _is_system_entry(task)]
+                if chunk_notes:
+                    extracted_tasks_raw = [task for task in extracted_tasks_raw if not _is_system_entry(task)]
+                # Validate all task objects in one Pydantic pass
+                with metrics.span("validation") as sizes:
+                    sizes["tasks"] = len(extracted_tasks_raw)
+                    validated_tasks, validation_errors = validate_tasks(extracted_tasks_raw)
+                logger.info("Successfully validated %d tasks out of %d received from LLM.", len(validated_tasks), len(extracted_tasks_raw))
 
                 # --- De-duplication Logic (applied to validated tasks) --- 
-                unique_tasks = []
-                seen_items = set()
-                for task in validated_tasks:
-                    item_text = task.get('item') # Use .get for safety, though Pydantic ensures it exists
-                    if isinstance(item_text, str):
-                        normalized_item = normalize_task_item(item_text)
-                        if normalized_item and normalized_item not in seen_items:
-                            seen_items.add(normalized_item)
-                            unique_tasks.append(task)
-                        elif normalized_item:
-                            print(f"Duplicate task item found and removed after validation: '{item_text[:50]}...'")
-                    # No else needed, Pydantic validated 'item' exists and is str
-                print(f"Returning {len(unique_tasks)} tasks after de-duplication.")
+                with metrics.span("dedupe", scope="validated") as sizes:
+                    sizes["tasks"] = len(validated_tasks)
+                    unique_tasks = dedupe_tasks(validated_tasks)
+                if len(unique_tasks) < len(validated_tasks):
+                    logger.info("Removed %d duplicate or near-duplicate tasks after validation.", len(validated_tasks) - len(unique_tasks))
+                logger.info("Returning %d tasks after de-duplication.", len(unique_tasks))
+                with metrics.span("assignee_resolve") as sizes:
+                    sizes["tasks"] = len(unique_tasks)
+                    unique_tasks = assignee_resolver.resolve_tasks(unique_tasks)
                 tasks_to_return = unique_tasks
         else:
-            print(f"LLM agent did not return a valid list of tasks. Response: {extracted_tasks_raw}")
+            logger.error("LLM agent did not return a valid list of tasks. Response: %s", extracted_tasks_raw)
             tasks_to_return = [{
                 "item": "LLM Response Issue", 
                 "description": "LLM did not return a list of tasks as expected.", 
@@ -164,6 +238,7 @@ def upload_file():
                 "description": "Some files were skipped during parsing: " + ", ".join(skipped_files),
                 "priority": "Medium", "status": "Info", "assignee": "System", "dueDate": "", "confidence": "High"
              })
+        info_tasks.extend(chunk_notes)
         if validation_errors:
              info_tasks.append({
                 "item": "Validation Errors", 
@@ -174,10 +249,10 @@ def upload_file():
         # Combine info tasks and actual tasks
         final_tasks = info_tasks + tasks_to_return
 
-        return jsonify(tasks=final_tasks), 200
+        return {"tasks": final_tasks}, 200
 
     except Exception as e:
-        print(f"Error processing combined text in app.py: {e}")
+        logger.exception("Error processing combined text in app.py: %s", e)
         # Return a generic error task list to the frontend
         error_task = [{
             "item": "Unhandled Server Error", 
@@ -188,7 +263,336 @@ def upload_file():
             "dueDate": ""
         }]
         # Use 500 for server errors
-        return jsonify(tasks=error_task), 500
+        return {"tasks": error_task}, 500
+
+def _is_system_entry(task):
+    return isinstance(task, dict) and task.get('assignee') == 'System' and task.get('status') in ('Info', 'Error')
+
+def board_tasks(tasks):
+    """Drops the System info/error entries the upload endpoints prepend, keeping real tasks."""
+    return [task for task in tasks if isinstance(task, dict) and not _is_system_entry(task)]
+
+def _extraction_failed(tasks):
+    # Error tasks other than the validation summary mean the LLM call itself failed
+    return any(task.get('status') == 'Error' and task.get('item') != 'Validation Errors' for task in tasks)
+
+def store_extraction(tasks, title, source_files, session=None):
+    """Saves a successful extraction to the task store. Returns the meeting id, or None if not stored."""
+    if not STORE_TASKS or _extraction_failed(tasks):
+        return None
+    try:
+        if session is not None and session.meeting_id is not None:
+            if task_store.replace_tasks(session.meeting_id, board_tasks(tasks)):
+                return session.meeting_id
+        return task_store.save_meeting(board_tasks(tasks), title=title, source_files=source_files,
+                                       session_id=session.id if session is not None else None)
+    except Exception as e:
+        # Storing history must never fail the extraction itself
+        logger.exception("Could not store tasks: %s", e)
+        return None
+
+def _meeting_title(filenames):
+    return request.form.get('title') or ", ".join(filenames)
+
+def _wants_async_job():
+    """Job mode is requested with ?async=1 or a form field mode=async."""
+    return (request.args.get('async', '').lower() in ('1', 'true', 'yes')
+            or request.form.get('mode', '').lower() == 'async')
+
+@app.route('/api/upload', methods=['POST'])
+def upload_file():
+    # Use getlist to handle multiple files with the same key 'file'
+    files = request.files.getlist('file')
+
+    if not files or all(f.filename == '' for f in files):
+        return jsonify(error="No selected file(s)"), 400
+
+    # Parsing stays in the request: the uploaded streams are only valid until it ends,
+    # and per-file errors can be reported immediately.
+    processed_files_count, skipped_files, parsed_files = parse_uploaded_files(files)
+
+    # Check if any files were successfully processed
+    if processed_files_count == 0:
+         error_message = "No processable files (.txt, .vtt, .srt) were found or all failed during parsing."
+         if skipped_files:
+             error_message += " Skipped files: " + ", ".join(skipped_files)
+         return jsonify(error=error_message), 400
+
+    logger.info("Parsed %d file(s) for LLM processing.", processed_files_count)
+
+    # Keep the parsed text server-side so the result can be re-analyzed without a new upload
+    session = session_store.create(parsed_files, skipped_files)
+    session.title = _meeting_title(list(session.files))
+
+    if _wants_async_job():
+        job = job_queue.submit(run_session_extraction, session)
+        logger.info("Queued extraction job %s for %d file(s).", job.id, processed_files_count)
+        return jsonify(job_id=job.id, status=job.status, status_url=f"/api/jobs/{job.id}",
+                       result_url=f"/api/jobs/{job.id}/result", session_id=session.id), 202
+
+    payload, status_code = run_session_extraction(session)
+    return jsonify(payload), status_code
+
+def run_session_extraction(session):
+    """Extracts (or re-extracts) a session's tasks and saves them on the session."""
+    meeting_id = None
+    with session.lock:
+        payload, status_code = process_extraction(session.extract, session.skipped_files)
+        session.tasks = payload.get('tasks', [])
+        if status_code == 200:
+            meeting_id = store_extraction(session.tasks, session.title, list(session.files), session)
+        # A failed re-analyze stores nothing; the session keeps its meeting for the next one to replace
+        if meeting_id is not None:
+            session.meeting_id = meeting_id
+    payload['session_id'] = session.id
+    payload['meeting_id'] = meeting_id
+    return payload, status_code
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify(error="Unknown or expired session id"), 404
+    return jsonify(session_id=session.id, files=list(session.files), rules=session.rules, tasks=session.tasks), 200
+
+@app.route('/api/sessions/<session_id>/reanalyze', methods=['POST'])
+def reanalyze_session(session_id):
+    """
+    Re-runs extraction for a session with tweaked rules and/or edited transcript text.
+    JSON body (all optional): {"rules": "...", "files": {"<filename>": "<edited text>"}}.
+    Only segments whose text or rules changed are sent to the LLM again.
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify(error="Unknown or expired session id"), 404
+
+    body = request.get_json(silent=True) or {}
+    rules = body.get('rules', session.rules)
+    edited_files = body.get('files') or {}
+    if rules is not None and not isinstance(rules, str):
+        return jsonify(error="'rules' must be a string"), 400
+    if not isinstance(edited_files, dict) or not all(isinstance(text, str) for text in edited_files.values()):
+        return jsonify(error="'files' must map file names to transcript text"), 400
+    unknown_files = [name for name in edited_files if name not in session.files]
+    if unknown_files:
+        return jsonify(error="Unknown file(s) for this session: " + ", ".join(unknown_files)), 400
+
+    with session.lock:
+        session.rules = (rules.strip() or None) if rules else None
+        session.edit_files(edited_files)
+    payload, status_code = run_session_extraction(session)
+    payload['reanalyzed_segments'] = session.last_reanalyzed
+    return jsonify(payload), status_code
+
+def _sse_event(event, data):
+    """Formats one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/upload/stream', methods=['POST'])
+def upload_file_stream():
+    """
+    Streaming upload: tasks are pushed as Server-Sent Events as soon as the model closes each
+    task object. Events: "info" (skipped files), "task" (validated task), "invalid" (task that
+    failed validation), "error" (error task) and a final "done" with counts.
+    """
+    files = request.files.getlist('file')
+
+    if not files or all(f.filename == '' for f in files):
+        return jsonify(error="No selected file(s)"), 400
+
+    processed_files_count, skipped_files, parsed_files = parse_uploaded_files(files)
+    filenames = [filename for filename, _ in parsed_files]
+    title = _meeting_title(filenames)
+
+    if processed_files_count == 0:
+         error_message = "No processable files (.txt, .vtt, .srt) were found or all failed during parsing."
+         if skipped_files:
+             error_message += " Skipped files: " + ", ".join(skipped_files)
+         return jsonify(error=error_message), 400
+
+    def generate():
+        if skipped_files:
+            yield _sse_event("info", {
+                "item": "Skipped Files Info",
+                "description": "Some files were skipped during parsing: " + ", ".join(skipped_files),
+                "priority": "Medium", "status": "Info", "assignee": "System", "dueDate": "", "confidence": "High"
+            })
+        streamed_tasks = []
+        invalid_count = 0
+        failed = False
+        try:
+            for kind, payload in stream_tasks_from_chunks(split_files(parsed_files)):
+                if kind == "error":
+                    failed = True
+                    yield _sse_event("error", payload)
+                    continue
+                try:
+                    task = TaskModel.model_validate(payload).model_dump()
+                except ValidationError as e:
+                    invalid_count += 1
+                    logger.warning("Validation Error for streamed task: %s. Data: %s", e, payload)
+                    yield _sse_event("invalid", {"errors": json.loads(e.json()), "task": payload})
+                    continue
+                task = assignee_resolver.resolve_tasks([task])[0]
+                streamed_tasks.append(task)
+                yield _sse_event("task", task)
+        except Exception as e:
+            failed = True
+            logger.exception("Error while streaming tasks in app.py: %s", e)
+            yield _sse_event("error", {
+                "item": "Unhandled Server Error",
+                "description": f"An unexpected error occurred on the server: {str(e)}",
+                "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""
+            })
+        meeting_id = None if failed else store_extraction(streamed_tasks, title, filenames)
+        yield _sse_event("done", {"tasks": len(streamed_tasks), "invalid": invalid_count, "meeting_id": meeting_id})
+
+    # X-Accel-Buffering stops nginx from buffering the stream
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job id"), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job id"), 404
+    if not job.is_finished():
+        # Not ready yet: same body as the status endpoint, 202 tells the client to keep polling
+        return jsonify(job.to_dict()), 202
+    if job.status == JOB_FAILED:
+        return jsonify(tasks=[{
+            "item": "Unhandled Server Error",
+            "description": f"An unexpected error occurred on the server: {job.error}",
+            "priority": "High",
+            "status": "Error",
+            "assignee": "System",
+            "dueDate": ""
+        }]), 500
+    payload, status_code = job.result
+    return jsonify(payload), status_code
+
+@app.route('/api/export', methods=['POST'])
+def export_tasks():
+    """Builds the styled .xlsx board for the posted {"tasks": [...]} and streams it from memory."""
+    # Large boards post more JSON than the upload file-size limit allows
+    request.max_content_length = EXPORT_MAX_BODY_MB * 1024 * 1024
+    payload = request.get_json(silent=True) or {}
+    tasks = payload.get('tasks')
+    if not isinstance(tasks, list):
+        return jsonify(error="Request body must be JSON with a 'tasks' list"), 400
+
+    # Skip the System info/error entries the upload endpoint prepends
+    tasks = board_tasks(tasks)
+    try:
+        with metrics.span("export") as sizes:
+            from excel_builder import build_workbook # Imported on first export
+            sizes["tasks"] = len(tasks)
+            output = build_workbook(tasks, output=io.BytesIO())
+            sizes["bytes"] = output.getbuffer().nbytes
+    except Exception as e:
+        logger.exception("Error building Excel export: %s", e)
+        return jsonify(error=f"Could not build the spreadsheet: {e}"), 500
+    output.seek(0)
+    logger.info("Exported %d tasks to Excel (%d bytes).", len(tasks), output.getbuffer().nbytes)
+    return send_file(
+        output,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name='tasks_board.xlsx',
+    )
+
+@app.route('/api/tasks', methods=['GET'])
+def list_tasks():
+    """
+    Searches stored tasks across meetings. Query parameters (all optional): assignee, status,
+    open=1 (not Done), due_after / due_before (YYYY-MM-DD), meeting_id, q (full-text search over
+    item, description and source excerpt), page, page_size (max 200).
+    """
+    args = request.args
+    return jsonify(task_store.query_tasks(
+        assignee=args.get('assignee'),
+        status=args.get('status'),
+        open_only=args.get('open', '').lower() in ('1', 'true', 'yes'),
+        due_after=args.get('due_after'),
+        due_before=args.get('due_before'),
+        meeting_id=args.get('meeting_id', type=int),
+        search=args.get('q'),
+        page=args.get('page', 1, type=int),
+        page_size=args.get('page_size', 50, type=int),
+    )), 200
+
+@app.route('/api/meetings', methods=['GET'])
+def list_meetings():
+    return jsonify(task_store.list_meetings(page=request.args.get('page', 1, type=int),
+                                            page_size=request.args.get('page_size', 50, type=int))), 200
+
+@app.route('/api/meetings/<int:meeting_id>', methods=['GET'])
+def get_meeting(meeting_id):
+    meeting = task_store.get_meeting(meeting_id)
+    if meeting is None:
+        return jsonify(error="Unknown meeting id"), 404
+    return jsonify(meeting), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(extraction_cache.stats()), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Stage latency histograms, size counters and queue/cache gauges in the Prometheus text format."""
+    cache_stats = extraction_cache.stats()
+    gauges = {
+        "taskforge_extraction_cache_hits_total": ("Extraction cache hits since start.", cache_stats["hits"], "counter"),
+        "taskforge_extraction_cache_misses_total": ("Extraction cache misses since start.", cache_stats["misses"], "counter"),
+        "taskforge_extraction_cache_entries": ("Entries in the in-memory extraction cache.", cache_stats["memory_entries"]),
+        "taskforge_sessions": ("Re-analyze sessions held in memory.", len(session_store)),
+        "taskforge_session_chars": ("Transcript characters held by re-analyze sessions.", session_store.total_chars()),
+    }
+    for status, count in job_queue.counts().items():
+        gauges[f"taskforge_jobs_{status}"] = (f"Retained background jobs in the {status} state.", count)
+    return Response(metrics.render_prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
+_first_request_pending = True
+
+@app.before_request
+def _time_first_request():
+    if _first_request_pending:
+        g.first_request_started = time.perf_counter()
+
+@app.after_request
+def _record_first_request(response):
+    # Lazily imported parsers/exporter and first-use setup show up in this worker's first request
+    global _first_request_pending
+    started = g.pop('first_request_started', None)
+    if started is not None and _first_request_pending:
+        _first_request_pending = False
+        metrics.STARTUP_SECONDS.set(time.perf_counter() - started, phase="first_request")
+    return response
+
+def create_app():
+    """
+    App factory for gunicorn ("app:create_app()", see gunicorn.conf.py). With preload_app the
+    master runs this once before forking, so every worker starts with the shared LLM client,
+    the compiled task validators and the cached prompt token counts already in memory.
+    """
+    started = time.perf_counter()
+    try:
+        get_llm_client(LLM_PROVIDER)
+    except LLMConfigurationError as e:
+        logger.warning("LLM client not warmed up: %s", e)
+    validate_tasks([{"item": "Warm up", "assignee": "System", "priority": "Low", "status": "Todo",
+                     "dueDate": "TBD", "description": "", "source_excerpt": "Warm up"}])
+    prompt_budget.input_tokens() # Loads the tokenizer and counts the system prompt
+    metrics.STARTUP_SECONDS.set(time.perf_counter() - started, phase="warm")
+    logger.info("Warmed up in %.0f ms.", (time.perf_counter() - started) * 1000)
+    return app
 
 # Serve React App
 @app.route('/', defaults={'path': ''})
@@ -199,11 +603,13 @@ def serve_react_app(path):
     else:
         return app.send_static_file('index.html')
 
+metrics.STARTUP_SECONDS.set(time.perf_counter() - _import_started, phase="import")
+
 if __name__ == '__main__':
     # Debug mode should be False in production
     # Use an environment variable to control debug mode and port
     # Example: FLASK_DEBUG=True FLASK_RUN_PORT=5002 python app.py
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     port = int(os.environ.get('FLASK_RUN_PORT', 5001))
-    print(f"Starting Flask app with debug_mode={debug_mode} on port={port}")
+    logger.info("Starting Flask app with debug_mode=%s on port=%d", debug_mode, port)
     app.run(debug=debug_mode, port=port, host='0.0.0.0') # host='0.0.0.0' to be accessible externally
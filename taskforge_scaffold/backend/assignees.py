@@ -0,0 +1,175 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Assignee values produced by the LLM or the app itself that never map to a person
+UNRESOLVABLE_ASSIGNEES = {"unassigned", "system", "admin", "tbd", "team", "everyone"}
+
+_LABEL_NOISE_RE = re.compile(r"\(.*?\)|\[.*?\]|[^\w\s@.'-]") # "Alice (Acme)", "[PM] Bob"
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_label(label: str) -> str:
+    """Case-folds a name or speaker label and strips bracketed notes and punctuation."""
+    return _WHITESPACE_RE.sub(" ", _LABEL_NOISE_RE.sub(" ", label.casefold())).strip()
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class AssigneeResolver:
+    """
+    Maps speaker labels and LLM assignee strings to rows of the SQLite `people` table.
+    The table is loaded once into in-memory indexes (alias, full name, email, unique first
+    names, and a trigram index for fuzzy matches), so resolving a task costs dictionary
+    lookups rather than a query. refresh() compares the table with the indexed rows whenever
+    the database changes: new rows are appended to the indexes, and any other change (edits,
+    deletes) triggers a full rebuild.
+    """
+
+    def __init__(self, db_path: str, fuzzy_threshold: float = 0.5, refresh_interval: float = 5.0):
+        self.db_path = db_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._conn = None
+        self._data_version = None
+        self._last_check = 0.0
+        self._reset_indexes()
+
+    def _reset_indexes(self):
+        self._people = {} # id -> {"id", "full_name", "email", "alias"}
+        self._max_id = 0
+        self._exact = {} # normalized alias/name/email -> id
+        self._first_names = {} # normalized first name -> id, or None if shared by several people
+        self._trigrams = {} # trigram -> set of (id, normalized key)
+        self._keys = {} # normalized key -> trigram set
+
+    def _connect(self):
+        if self._conn is None:
+            if not os.path.exists(self.db_path):
+                return None
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+    def _index_person(self, person_id, full_name, email, alias):
+        self._people[person_id] = {"id": person_id, "full_name": full_name, "email": email, "alias": alias}
+        self._max_id = max(self._max_id, person_id)
+
+        keys = []
+        if full_name:
+            keys.append(normalize_label(full_name))
+            first_name = normalize_label(full_name).split(" ")[0]
+            if first_name:
+                # A first name only resolves on its own when exactly one person has it
+                self._first_names[first_name] = None if first_name in self._first_names else person_id
+        for one_alias in (alias or "").split(","):
+            if one_alias.strip():
+                keys.append(normalize_label(one_alias))
+        if email:
+            keys.append(email.casefold())
+            keys.append(normalize_label(email.split("@")[0].replace(".", " ")))
+
+        for key in keys:
+            if not key:
+                continue
+            self._exact.setdefault(key, person_id)
+            grams = _trigrams(key)
+            self._keys[key] = grams
+            for gram in grams:
+                self._trigrams.setdefault(gram, set()).add((person_id, key))
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Brings the indexes up to date with the database. Returns True if anything changed.
+        Checks are skipped for `refresh_interval` seconds unless force is set.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.refresh_interval:
+                return False
+            self._last_check = now
+            conn = self._connect()
+            if conn is None:
+                return False
+            try:
+                # data_version changes whenever another connection commits to the database
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version and not force:
+                    return False
+                rows = conn.execute("SELECT id, full_name, email, alias FROM people ORDER BY id").fetchall()
+                new_rows = [row for row in rows if row[0] > self._max_id]
+                # Every indexed row must still be there with the same content; otherwise rebuild
+                unchanged = len(rows) - len(new_rows) == len(self._people) and all(
+                    self._people.get(person_id) == {"id": person_id, "full_name": full_name, "email": email, "alias": alias}
+                    for person_id, full_name, email, alias in rows if person_id <= self._max_id
+                )
+                if not unchanged:
+                    # Rows were edited or deleted: rebuild from scratch
+                    self._reset_indexes()
+                    for row in rows:
+                        self._index_person(*row)
+                    logger.info("Reloaded %d people for assignee resolution.", len(self._people))
+                elif new_rows:
+                    for row in new_rows:
+                        self._index_person(*row)
+                    logger.info("Indexed %d new people for assignee resolution.", len(new_rows))
+                self._data_version = data_version
+                # Task store writes to the same database also change data_version
+                return bool(new_rows) or not unchanged
+            except sqlite3.Error as e:
+                # e.g. the people table does not exist yet
+                logger.warning("Could not load people for assignee resolution: %s", e)
+                return False
+
+    def resolve(self, label: str):
+        """Returns the matching person dict for a name/alias/speaker label, or None."""
+        if not label or not isinstance(label, str):
+            return None
+        key = normalize_label(label)
+        if not key or key in UNRESOLVABLE_ASSIGNEES:
+            return None
+        with self._lock:
+            person_id = self._exact.get(key) or self._exact.get(label.casefold().strip())
+            if person_id is None:
+                person_id = self._first_names.get(key)
+            if person_id is None:
+                person_id = self._fuzzy_match(key)
+            return self._people.get(person_id) if person_id is not None else None
+
+    def _fuzzy_match(self, key: str):
+        # Trigram Jaccard similarity against keys sharing at least one trigram
+        grams = _trigrams(key)
+        shared = {}
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best_id, best_score = None, self.fuzzy_threshold
+        for (person_id, candidate_key), overlap in shared.items():
+            score = overlap / (len(grams) + len(self._keys[candidate_key]) - overlap)
+            if score >= best_score:
+                best_id, best_score = person_id, score
+        return best_id
+
+    def resolve_many(self, labels) -> dict:
+        """Resolves a batch of labels; each distinct label is looked up once."""
+        self.refresh()
+        return {label: self.resolve(label) for label in set(labels)}
+
+    def resolve_tasks(self, tasks: list) -> list:
+        """
+        Replaces each task's `assignee` with the matched person's full name and adds
+        `assignee_email`. Tasks whose assignee does not match anyone are left unchanged.
+        """
+        matches = self.resolve_many(task.get("assignee") for task in tasks if isinstance(task.get("assignee"), str))
+        resolved = []
+        for task in tasks:
+            person = matches.get(task.get("assignee"))
+            if person is not None:
+                task = dict(task, assignee=person["full_name"] or task["assignee"], assignee_email=person["email"])
+            resolved.append(task)
+        return resolved
@@ -0,0 +1,402 @@
+"""
+Offline benchmark of the upload pipeline: parsing, LLM extraction (against the deterministic
+FakeBackend from llm_pool, with configurable latency), validation/de-duplication through
+/api/upload, and the Excel export through /api/export. No API key or network access is used.
+
+    python benchmark.py --turns 2000 --speakers 6 --iterations 5 --llm-latency 0.2
+    python benchmark.py --save-baseline bench.json          # record a baseline
+    python benchmark.py --baseline bench.json --tolerance 0.25  # exit 1 on a regression
+    python benchmark.py --stages cold_start --iterations 10    # startup time only
+
+Reports latency percentiles, throughput and peak RSS per stage. The cold_start stage times
+fresh interpreters running `import app` and `app.create_app()`.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+# Quiet by default: per-request INFO logs would dominate the output and the timings
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["LLM_PROVIDER"] = "fake"
+# Synthetic meetings must not reach the real task store, nor resolve against real people
+os.environ["STORE_TASKS"] = "False"
+os.environ["TASKFORGE_DB"] = os.path.join(tempfile.gettempdir(), f"taskforge-bench-{os.getpid()}.db") # never created
+
+from werkzeug.datastructures import FileStorage
+
+import llm_agent
+from llm_pool import FakeBackend, LLMClient, TokenBucket, set_llm_client
+from parsers import parse_transcript
+
+FORMATS = ("txt", "vtt", "srt", "docx", "pdf")
+STAGES = ("cold_start", "parse", "extract", "upload", "export")
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Code run in a fresh interpreter per cold start measurement
+COLD_START_SNIPPETS = {
+    "import": "import app",
+    "create_app": "import app; app.create_app()",
+}
+
+_FIRST_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy", "Mallory", "Niaj"]
+_VERBS = ["send", "review", "update", "draft", "fix", "schedule", "prepare", "share", "test", "migrate"]
+_OBJECTS = ["the Q3 budget", "the release notes", "the onboarding guide", "the staging database", "the vendor contract",
+            "the customer survey", "the design mockups", "the load test plan", "the sprint report", "the API docs"]
+_DEADLINES = ["by Friday", "next week", "before the demo", "by end of month", "tomorrow", "after the offsite"]
+_FILLER = ["I think we covered most of it last time.", "Can everyone see my screen?",
+           "Let's circle back on that once we have the numbers.", "That matches what the customer told us.",
+           "We should keep an eye on the error rate.", "Good point, I had not considered that.",
+           "The dashboard looked fine this morning.", "Let me check the notes from the previous meeting."]
+
+# --- Synthetic transcripts ---
+
+def generate_turns(turns: int, speakers: int, commitment_every: int = 5, seed: int = 7) -> list:
+    """Returns [(speaker, text)] for a meeting; every `commitment_every`-th turn is an "I will ..." commitment."""
+    rng = random.Random(seed)
+    names = [_FIRST_NAMES[i] if i < len(_FIRST_NAMES) else f"Speaker {i + 1}" for i in range(max(1, speakers))]
+    result = []
+    for index in range(turns):
+        speaker = names[index % len(names)] if index % 3 else rng.choice(names)
+        if commitment_every and index % commitment_every == commitment_every - 1:
+            text = f"I will {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} {rng.choice(_DEADLINES)} (item {index})."
+        else:
+            text = " ".join(rng.choice(_FILLER) for _ in range(rng.randint(1, 3)))
+        result.append((speaker, text))
+    return result
+
+def _timestamp(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    return f"{millis // 3600000:02d}:{millis // 60000 % 60:02d}:{millis // 1000 % 60:02d}{separator}{millis % 1000:03d}"
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _make_pdf(lines: list, lines_per_page: int = 50) -> bytes:
+    """Writes a minimal text-only PDF (Helvetica, one Tj per line) without a PDF library."""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"] # 1: catalog, 2: page tree, 3: font
+    page_ids = []
+    for page_lines in pages:
+        content = "BT /F1 9 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        data = content.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>").encode())
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref_offset = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+    return out.getvalue()
+
+def _make_docx(lines: list) -> bytes:
+    from docx import Document
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+def generate_transcript(file_format: str, turns: list, seconds_per_turn: float = 4.0) -> bytes:
+    """Renders [(speaker, text)] turns as the bytes of a .txt, .vtt, .srt, .docx or .pdf transcript."""
+    lines = [f"{speaker}: {text}" for speaker, text in turns]
+    if file_format == "txt":
+        return ("\n".join(lines) + "\n").encode("utf-8")
+    if file_format == "vtt":
+        cues = ["WEBVTT", ""]
+        for index, (speaker, text) in enumerate(turns):
+            start, end = index * seconds_per_turn, (index + 1) * seconds_per_turn - 0.5
+            cues += [f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}", f"<v {speaker}>{text}", ""]
+        return "\n".join(cues).encode("utf-8")
+    if file_format == "srt":
+        cues = []
+        for index, line in enumerate(lines):
+            start, end = index * seconds_per_turn, (index + 1) * seconds_per_turn - 0.5
+            cues += [str(index + 1), f"{_timestamp(start, ',')} --> {_timestamp(end, ',')}", line, ""]
+        return "\n".join(cues).encode("utf-8")
+    if file_format == "docx":
+        return _make_docx(lines)
+    if file_format == "pdf":
+        return _make_pdf(lines)
+    raise ValueError(f"Unsupported benchmark format: {file_format}")
+
+# --- Measurement ---
+
+# Appended to each cold start snippet: the child reports its own lifetime peak (raw ru_maxrss)
+_PRINT_MAXRSS = "\nimport resource\nprint(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+def _maxrss_mb(maxrss: int) -> float:
+    # Linux reports kilobytes, macOS bytes
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process over its whole lifetime so far, in MB."""
+    if resource is None:
+        return 0.0
+    return _maxrss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class StagePeakRSS:
+    """
+    Peak RSS while a stage runs, sampled every `interval` seconds on a background thread, so a
+    stage is not charged for an earlier stage's peak (ru_maxrss only ever grows). Without /proc
+    it falls back to the process-lifetime peak, and `cumulative` is set.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self.cumulative = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if current_rss_mb() is None:
+            self.cumulative = True
+            return self
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.cumulative:
+            self.peak = peak_rss_mb()
+            return
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of `values` (fraction in 0..1)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(fraction * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(name: str, latencies: list, total_bytes: int = 0, total_items: int = 0, peak_rss: float = 0.0) -> dict:
+    elapsed = sum(latencies)
+    return {
+        "stage": name,
+        "iterations": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "ops_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "mb_per_s": total_bytes / (1024 * 1024) / elapsed if elapsed and total_bytes else 0.0,
+        "items_per_s": total_items / elapsed if elapsed and total_items else 0.0,
+        "peak_rss_mb": peak_rss,
+    }
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def install_fake_llm(latency: float) -> FakeBackend:
+    """Routes extraction to a FakeBackend with `latency` seconds per call and no rate limit."""
+    backend = FakeBackend(latency=latency)
+    set_llm_client("fake", LLMClient(backend, rate_limiter=TokenBucket(0, 1), max_retries=0))
+    llm_agent.LLM_PROVIDER = "fake"
+    return backend
+
+def bench_cold_start(iterations: int) -> list:
+    """Wall time of fresh interpreters importing (and warming) the app, as an autoscaled worker would."""
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    results = []
+    for name, code in COLD_START_SNIPPETS.items():
+        latencies = []
+        peak = 0.0
+        if resource is not None:
+            code += _PRINT_MAXRSS
+        for _ in range(iterations):
+            latency, completed = _timed(lambda: subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                                                               capture_output=True, text=True))
+            if completed.returncode != 0:
+                raise RuntimeError(f"Cold start ({code}) failed: {completed.stderr[-500:]}")
+            latencies.append(latency)
+            if resource is not None:
+                peak = max(peak, _maxrss_mb(int(completed.stdout.split()[-1])))
+        results.append(summarize(f"cold:{name}", latencies, peak_rss=peak))
+    return results
+
+def bench_parse(documents: dict, iterations: int) -> list:
+    results = []
+    for file_format, data in documents.items():
+        latencies = []
+        with StagePeakRSS() as rss:
+            for _ in range(iterations):
+                upload = FileStorage(stream=io.BytesIO(data), filename=f"meeting.{file_format}")
+                latency, _ = _timed(lambda: parse_transcript(upload))
+                latencies.append(latency)
+        results.append(summarize(f"parse:{file_format}", latencies, total_bytes=len(data) * iterations, peak_rss=rss.peak))
+    return results
+
+def bench_extract(transcript_text: str, iterations: int, use_cache: bool) -> dict:
+    latencies = []
+    tasks = 0
+    with StagePeakRSS() as rss:
+        for _ in range(iterations):
+            if not use_cache:
+                llm_agent.extraction_cache.clear()
+            latency, extracted = _timed(lambda: llm_agent.extract_tasks_from_transcript(transcript_text))
+            latencies.append(latency)
+            tasks += len(extracted)
+    return summarize("extract", latencies, total_bytes=len(transcript_text.encode("utf-8")) * iterations, total_items=tasks,
+                     peak_rss=rss.peak)
+
+def bench_upload(client, documents: dict, iterations: int, use_cache: bool):
+    latencies = []
+    tasks = []
+    with StagePeakRSS() as rss:
+        for _ in range(iterations):
+            if not use_cache:
+                llm_agent.extraction_cache.clear()
+            files = [(io.BytesIO(data), f"meeting.{file_format}") for file_format, data in documents.items()]
+            latency, response = _timed(lambda: client.post("/api/upload", data={"file": files},
+                                                           content_type="multipart/form-data"))
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/upload returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            latencies.append(latency)
+            tasks = response.get_json()["tasks"]
+    total_bytes = sum(len(data) for data in documents.values()) * iterations
+    return summarize("upload", latencies, total_bytes=total_bytes, total_items=len(tasks) * iterations,
+                     peak_rss=rss.peak), tasks
+
+def bench_export(client, tasks: list, iterations: int) -> dict:
+    latencies = []
+    with StagePeakRSS() as rss:
+        for _ in range(iterations):
+            latency, response = _timed(lambda: client.post("/api/export", json={"tasks": tasks}))
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/export returned {response.status_code}")
+            latencies.append(latency)
+    return summarize("export", latencies, total_items=len(tasks) * iterations, peak_rss=rss.peak)
+
+def run(args) -> list:
+    formats = [name.strip() for name in args.formats.split(",") if name.strip()]
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    turns = generate_turns(args.turns, args.speakers, args.commitment_every, args.seed)
+    documents = {file_format: generate_transcript(file_format, turns) for file_format in formats}
+    backend = install_fake_llm(args.llm_latency)
+
+    results = []
+    if "cold_start" in stages:
+        results.extend(bench_cold_start(args.iterations))
+    if "parse" in stages:
+        results.extend(bench_parse(documents, args.iterations))
+    if "extract" in stages:
+        transcript_text = "\n".join(f"{speaker}: {text}" for speaker, text in turns)
+        results.append(bench_extract(transcript_text, args.iterations, args.cache))
+    if "upload" in stages or "export" in stages:
+        import app as taskforge_app # Imported late so --stages parse measures the parsers alone
+        client = taskforge_app.app.test_client()
+        upload_result, tasks = bench_upload(client, documents, args.iterations if "upload" in stages else 1, args.cache)
+        if "upload" in stages:
+            results.append(upload_result)
+        if "export" in stages:
+            results.append(bench_export(client, tasks, args.iterations))
+    if current_rss_mb() is None:
+        print("No /proc: in-process stages report the process-lifetime peak RSS, not their own.", file=sys.stderr)
+    if backend.calls:
+        print(f"Fake LLM calls: {backend.calls} ({args.llm_latency * 1000:.0f} ms each)", file=sys.stderr)
+    return results
+
+def print_table(results: list):
+    header = f"{'stage':<16}{'n':>4}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ops/s':>9}{'MB/s':>9}{'items/s':>10}{'peak RSS MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(f"{result['stage']:<16}{result['iterations']:>4}{result['p50_ms']:>10.1f}{result['p90_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['max_ms']:>10.1f}{result['ops_per_s']:>9.2f}{result['mb_per_s']:>9.2f}"
+              f"{result['items_per_s']:>10.1f}{result['peak_rss_mb']:>13.1f}")
+
+def find_regressions(results: list, baseline: list, tolerance: float) -> list:
+    """Stages whose p90 latency or peak RSS exceeds the baseline by more than `tolerance` (a fraction)."""
+    previous = {result["stage"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["stage"])
+        if before is None:
+            continue
+        for key in ("p90_ms", "peak_rss_mb"):
+            if before[key] and result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{result['stage']}: {key} {before[key]:.1f} -> {result[key]:.1f}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=1000, help="speaker turns per synthetic transcript")
+    parser.add_argument("--speakers", type=int, default=4, help="distinct speakers in the transcript")
+    parser.add_argument("--commitment-every", type=int, default=5, help="every Nth turn is an 'I will ...' commitment")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated formats to generate")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages to run")
+    parser.add_argument("--iterations", type=int, default=5, help="runs per stage")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds the fake model takes per call")
+    parser.add_argument("--cache", action="store_true", help="keep the extraction cache between iterations")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print results as JSON instead of a table")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results saved with --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs. the baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against " + args.baseline + ":\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,210 @@
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import PatternFill, Font
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
 
 import utils
 
-def build_workbook(tasks: list, team_db_file) -> str:
-    wb = Workbook()
-    wb.remove(wb.active)
-    tasks_by_owner = utils.group_by_owner(tasks)
-    for owner, items in tasks_by_owner.items():
-        ws = wb.create_sheet(owner)
-        df = pd.DataFrame(items)
-        for r in dataframe_to_rows(df, index=False, header=True):
-            ws.append(r)
-        # Add styling here...
-    output_path = "tasks_board.xlsx"
-    wb.save(output_path)
-    return output_path
+# (task key, header, column width) in sheet order
+COLUMNS = [
+    ("item", "Item", 45),
+    ("assignee", "Assignee", 20),
+    ("priority", "Priority", 12),
+    ("status", "Status", 20),
+    ("dueDate", "Due Date", 14),
+    ("description", "Description", 60),
+    ("confidence", "Confidence", 12),
+    ("source_excerpt", "Source Excerpt", 60),
+]
+HEADER_CLR = "1F2430"
+STATUS_OPTIONS = ["Todo", "Working on it", "Stuck", "Waiting for review", "Done"]
+
+# Rows buffered before they are compressed into the sheet's zip entry
+ROWS_PER_WRITE = 1000
+
+_INVALID_SHEET_CHARS_RE = re.compile(r'[\[\]:*?/\\]')
+# Control characters XML 1.0 does not allow (LLM output can contain them)
+_ILLEGAL_XML_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Text starting with one of these is a formula when typed into Excel (=HYPERLINK(...), +cmd|...)
+_FORMULA_PREFIXES = ("=", "+", "-", "@")
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+def _named_styles() -> list:
+    """(key, style name, fill colour, bold) for the header and every priority/status colour."""
+    styles = [("header", "tf_header", HEADER_CLR, True)]
+    styles += [(("priority", value), f"tf_priority_{value}", colour, False) for value, colour in utils.PRIORITY_CLR.items()]
+    styles += [(("status", value), f"tf_status_{value}", colour, False) for value, colour in utils.STATUS_CLR.items()]
+    return styles
+
+_NAMED_STYLES = _named_styles()
+# Cell format index: 0 is the default, 1 plain text with a quote prefix, then one per named style
+_TEXT_XF = 1
+_STYLE_XF = {key: index for index, (key, _, _, _) in enumerate(_NAMED_STYLES, start=2)}
+
+def _styles_xml() -> str:
+    """
+    styles.xml with one named cell style per header/priority/status colour. Cells reference
+    these by index, so the file holds a handful of shared styles instead of a style per cell.
+    """
+    fills = "".join(f'<fill><patternFill patternType="solid"><fgColor rgb="FF{colour}"/></patternFill></fill>'
+                    for _, _, colour, _ in _NAMED_STYLES)
+    alignment = '<alignment horizontal="center" vertical="center"/>'
+    style_xfs = "".join(
+        f'<xf numFmtId="0" fontId="{2 if bold else 1}" fillId="{index}" borderId="0" applyFill="1" applyFont="1" applyAlignment="1">{alignment}</xf>'
+        for index, (_, _, _, bold) in enumerate(_NAMED_STYLES, start=2))
+    cell_xfs = "".join(
+        f'<xf numFmtId="0" fontId="{2 if bold else 1}" fillId="{index}" borderId="0" xfId="{index - 1}" applyFill="1" applyFont="1" applyAlignment="1">{alignment}</xf>'
+        for index, (_, _, _, bold) in enumerate(_NAMED_STYLES, start=2))
+    cell_styles = "".join(f'<cellStyle name="{name}" xfId="{index}"/>'
+                          for index, (_, name, _, _) in enumerate(_NAMED_STYLES, start=1))
+    return (
+        f'{_XML_DECLARATION}<styleSheet xmlns="{_MAIN_NS}">'
+        '<fonts count="3"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font></fonts>'
+        f'<fills count="{len(_NAMED_STYLES) + 2}"><fill><patternFill patternType="none"/></fill>'
+        f'<fill><patternFill patternType="gray125"/></fill>{fills}</fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        f'<cellStyleXfs count="{len(_NAMED_STYLES) + 1}"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>{style_xfs}</cellStyleXfs>'
+        f'<cellXfs count="{len(_NAMED_STYLES) + 2}"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        f'<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0" quotePrefix="1"/>{cell_xfs}</cellXfs>'
+        f'<cellStyles count="{len(_NAMED_STYLES) + 1}"><cellStyle name="Normal" xfId="0" builtinId="0"/>{cell_styles}</cellStyles>'
+        '</styleSheet>'
+    )
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+_COLUMN_LETTERS = [_column_letter(index) for index in range(1, len(COLUMNS) + 1)]
+
+def _sheet_title(owner: str, used: set) -> str:
+    # Excel sheet names: max 31 chars, no []:*?/\ and unique case-insensitively
+    base = _INVALID_SHEET_CHARS_RE.sub("_", owner or "Unassigned").strip("'") or "Unassigned"
+    base = base[:31]
+    title = base
+    suffix = 2
+    while title.lower() in used:
+        tag = f" ({suffix})"
+        title = base[:31 - len(tag)] + tag
+        suffix += 1
+    used.add(title.lower())
+    return title
+
+def _cell_value(value):
+    # LLM output can contain nulls, nested values or control characters XML rejects
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return value
+    return _ILLEGAL_XML_CHARS_RE.sub("", str(value))
+
+def _cell_xml(ref: str, value, style: int = None) -> str:
+    """
+    One cell. Text is always an inline string, never a formula, so values such as
+    '=HYPERLINK(...)' from a transcript stay inert; those also get the quote-prefix format,
+    so editing the cell in Excel keeps it text.
+    """
+    if not isinstance(value, str):
+        return f'<c r="{ref}"><v>{value!r}</v></c>'
+    if style is None and value.startswith(_FORMULA_PREFIXES):
+        style = _TEXT_XF
+    style_attr = f' s="{style}"' if style is not None else ""
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>'
+
+def _write_sheet(archive, path: str, tasks: list):
+    """Streams one owner's sheet into the archive, ROWS_PER_WRITE rows at a time."""
+    keys = [key for key, _, _ in COLUMNS]
+    cols = "".join(f'<col min="{index}" max="{index}" width="{width}" customWidth="1"/>'
+                   for index, (_, _, width) in enumerate(COLUMNS, start=1))
+    header = "".join(_cell_xml(f"{letter}1", label, _STYLE_XF["header"])
+                     for letter, (_, label, _) in zip(_COLUMN_LETTERS, COLUMNS))
+    with archive.open(path, "w") as sheet:
+        sheet.write((
+            f'{_XML_DECLARATION}<worksheet xmlns="{_MAIN_NS}">'
+            f'<dimension ref="A1:{_COLUMN_LETTERS[-1]}{len(tasks) + 1}"/><sheetViews><sheetView workbookViewId="0">'
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+            f'<sheetFormatPr defaultRowHeight="15"/><cols>{cols}</cols>'
+            f'<sheetData><row r="1">{header}</row>'
+        ).encode("utf-8"))
+        rows = []
+        for row_number, task in enumerate(tasks, start=2):
+            cells = []
+            for letter, key in zip(_COLUMN_LETTERS, keys):
+                value = _cell_value(task.get(key))
+                if value == "":
+                    continue # Missing values are left as empty cells
+                cells.append(_cell_xml(f"{letter}{row_number}", value, _STYLE_XF.get((key, value))))
+            rows.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+            if len(rows) >= ROWS_PER_WRITE:
+                sheet.write("".join(rows).encode("utf-8"))
+                rows = []
+
+        # Dropdowns for priority and status over the written rows
+        last_row = max(2, len(tasks) + 1)
+        validations = "".join(
+            f'<dataValidation type="list" allowBlank="1" sqref="{_COLUMN_LETTERS[keys.index(key)]}2:{_COLUMN_LETTERS[keys.index(key)]}{last_row}">'
+            f'<formula1>{escape(chr(34) + ",".join(options) + chr(34))}</formula1></dataValidation>'
+            for key, options in (("priority", list(utils.PRIORITY_CLR)), ("status", STATUS_OPTIONS)))
+        rows.append(f'</sheetData><dataValidations count="2">{validations}</dataValidations></worksheet>')
+        sheet.write("".join(rows).encode("utf-8"))
+
+def _package_xml(titles: list) -> dict:
+    """Workbook, relationship and content-type parts for sheets 1..n."""
+    numbers = range(1, len(titles) + 1)
+    sheets = "".join(f'<sheet name={quoteattr(title)} sheetId="{number}" r:id="rId{number}"/>'
+                     for number, title in zip(numbers, titles))
+    sheet_rels = "".join(f'<Relationship Id="rId{number}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{number}.xml"/>'
+                         for number in numbers)
+    sheet_types = "".join(f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+                          'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                          for number in numbers)
+    return {
+        "[Content_Types].xml": (
+            f'{_XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{sheet_types}</Types>'
+        ),
+        "_rels/.rels": (
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'{_XML_DECLARATION}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            f'<bookViews><workbookView activeTab="0"/></bookViews><sheets>{sheets}</sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_REL_NS}">{sheet_rels}'
+            f'<Relationship Id="rId{len(titles) + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/></Relationships>'
+        ),
+        "xl/styles.xml": _styles_xml(),
+    }
+
+def build_workbook(tasks: list, team_db_file=None, output="tasks_board.xlsx"):
+    """
+    Builds the styled task board with one sheet per assignee (plus "Unassigned").
+    The .xlsx parts are written straight into the zip archive and each sheet's rows are
+    compressed as they are produced, so memory stays bounded and no per-cell objects are
+    built. `output` may be a path or a binary file-like object (e.g. io.BytesIO for
+    serving from memory); it is returned.
+    """
+    tasks_by_owner = utils.group_by_owner(tasks) or {"Unassigned": []}
+    used_titles = set()
+    titles = []
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for number, (owner, items) in enumerate(tasks_by_owner.items(), start=1):
+            titles.append(_sheet_title(owner, used_titles))
+            _write_sheet(archive, f"xl/worksheets/sheet{number}.xml", items)
+        for path, xml in _package_xml(titles).items():
+            archive.writestr(path, xml)
+    return output
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_transcript_text(text: str) -> str:
+    """Collapses whitespace so re-exports that only differ in line endings or spacing share a key."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_cache_key(transcript_text: str, model: str, system_prompt: str) -> str:
+    """Content address of an extraction: transcript hash, model name and prompt hash."""
+    return f"{_sha256(normalize_transcript_text(transcript_text))}:{model}:{_sha256(system_prompt)}"
+
+def _copy_tasks(tasks: list) -> list:
+    # Callers may annotate the task dicts they get back; keep the cached entry untouched
+    return [dict(task) if isinstance(task, dict) else task for task in tasks]
+
+class ExtractionCache:
+    """
+    Two-level cache of LLM extraction results.
+    A bounded in-memory LRU sits in front of an optional SQLite table (enabled by passing
+    `db_path`) so results survive restarts and are shared between gunicorn workers.
+    Entries older than `ttl_seconds` are treated as misses and evicted.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 7 * 24 * 3600, db_path: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict() # key -> (stored_at, tasks)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db()
+            # A SQLite connection must not be used across fork (gunicorn --preload): reopen in each child
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._after_fork)
+
+    def _open_db(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache("
+            "  key TEXT PRIMARY KEY,"
+            "  tasks TEXT NOT NULL,"
+            "  stored_at REAL NOT NULL"
+            ")"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_stored_at ON extraction_cache(stored_at)")
+        self._db.commit()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._open_db()
+
+    def get(self, key: str):
+        """Returns a copy of the cached task list for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, tasks = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return _copy_tasks(tasks)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT tasks, stored_at FROM extraction_cache WHERE key = ? AND stored_at >= ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    tasks = json.loads(row[0])
+                    self._remember(key, row[1], tasks)
+                    self.hits += 1
+                    return _copy_tasks(tasks)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, tasks: list):
+        now = time.time()
+        tasks = _copy_tasks(tasks)
+        with self._lock:
+            self._remember(key, now, tasks)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extraction_cache(key, tasks, stored_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(tasks), now),
+                )
+                self._db.execute("DELETE FROM extraction_cache WHERE stored_at < ?", (now - self.ttl_seconds,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM extraction_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+            }
+
+    def _remember(self, key, stored_at, tasks):
+        # Caller holds self._lock
+        self._memory[key] = (stored_at, tasks)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
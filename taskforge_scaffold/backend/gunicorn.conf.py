@@ -0,0 +1,22 @@
+import os
+
+# Preforked production server: gunicorn -c gunicorn.conf.py (from the backend directory).
+# The master imports the app and runs create_app() once; workers are forked from it with the
+# LLM client, validators and tokenizer already loaded, so new workers serve immediately.
+
+bind = f"0.0.0.0:{os.environ.get('FLASK_RUN_PORT', '5001')}"
+wsgi_app = "app:create_app()"
+preload_app = True
+
+# Jobs, sessions and metrics live in each worker's memory (see README): with more than one
+# worker, /api/jobs/<id> and /api/sessions/<id>/reanalyze polls that reach another worker get a 404.
+# A single worker with threads is the default; only raise WEB_CONCURRENCY behind sticky sessions.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Synchronous uploads and SSE streams wait on the LLM, which can take longer than gunicorn's 30s default
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+def when_ready(server):
+    if workers > 1:
+        server.log.warning("Running %d workers: async jobs and re-analyze sessions need sticky sessions.", workers)
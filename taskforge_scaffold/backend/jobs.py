@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states, as reported by GET /api/jobs/<id>
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+class Job:
+    """A unit of background work and its outcome."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def is_finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def to_dict(self) -> dict:
+        """Status summary for polling clients (the result itself is served separately)."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+class JobQueue:
+    """
+    In-process job queue backed by a bounded thread pool.
+    Finished jobs are kept for `result_ttl` seconds so clients can fetch the result, then evicted.
+    """
+
+    def __init__(self, max_workers: int = 2, result_ttl: int = 3600):
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="taskforge-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> Job:
+        """Queues fn(*args, **kwargs) and returns its Job immediately."""
+        job = Job()
+        with self._lock:
+            self._evict_expired()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str):
+        """Returns the Job for job_id, or None if it is unknown or has expired."""
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def counts(self) -> dict:
+        """Number of retained jobs in each state."""
+        with self._lock:
+            counts = dict.fromkeys((JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED), 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = JOB_DONE
+        except Exception as e:
+            logger.exception("Background job %s failed: %s", job.id, e)
+            job.error = str(e)
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _evict_expired(self):
+        # Caller holds self._lock
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -1,17 +1,45 @@
 import os
+import re
 import json
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from cerebras.cloud.sdk import Cerebras
+
+import metrics
+import utils
+from prompt_budget import PromptBudget, cached_token_count, count_tokens
+from extraction_cache import ExtractionCache, make_cache_key
+from llm_pool import LLMConfigurationError, get_llm_client
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Default model - can be made configurable later if needed
 DEFAULT_MODEL = "llama3.1-8b"
 
-# Max characters for the transcript to leave room for prompts and stay within token limits
-# 8192 token limit. Approx 4 chars/token. Prompts take some tokens.
-# Let's aim for transcript text to be around ~2000 tokens * 4 chars/token = 8000 chars.
-MAX_TRANSCRIPT_CHARS = 8000
+# Backend from llm_pool serving extraction requests ("cerebras", or "fake" for offline runs)
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "cerebras")
+
+# Tokens of trailing context repeated at the start of the next chunk, so commitments
+# that straddle a chunk boundary (question in one chunk, "Sure, I will" in the next) are kept.
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("LLM_CHUNK_OVERLAP_TOKENS", 150))
+
+# Maximum number of chunks sent to the model concurrently
+MAX_LLM_WORKERS = int(os.environ.get("LLM_MAX_WORKERS", 4))
+
+# Cache of per-chunk extraction results, so re-uploading a transcript costs no API calls.
+# Set EXTRACTION_CACHE_DB to a SQLite file path to persist entries across restarts and workers.
+extraction_cache = ExtractionCache(
+    max_entries=int(os.environ.get("EXTRACTION_CACHE_SIZE", 256)),
+    ttl_seconds=int(os.environ.get("EXTRACTION_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    db_path=os.environ.get("EXTRACTION_CACHE_DB") or None,
+)
+
+# A new segment starts at a file header, a blank line, or a "Speaker:" label
+# (optionally preceded by the "[hh:mm:ss]" cue timestamp written by parsers.format_cue)
+SPEAKER_LINE_RE = re.compile(r"^\s*(?:--- Transcript from: .* ---|(?:\[[\d:]+\] )?[A-Z][\w .'-]{0,40}:\s)")
 
 # System prompt to guide the LLM
 SYSTEM_PROMPT = """
@@ -36,76 +64,375 @@ Example of a single task object:
 Strictly adhere to this structure and field requirements for every object in the JSON list. Output the JSON list and nothing else.
 """
 
-def extract_tasks_from_transcript(transcript_text: str) -> list:
-    """
-    Sends the transcript text to the Cerebras LLM and attempts to extract tasks.
-    Returns a list of task dictionaries or an empty list if an error occurs or no tasks are found.
-    """
-    api_key = os.environ.get("CEREBRAS_API_KEY")
-    if not api_key:
-        print("Error: CEREBRAS_API_KEY environment variable not set.")
-        # Returning an error structure that the frontend can display
-        # Or, could raise an exception to be caught in app.py
-        return [{"item": "Configuration Error", "description": "CEREBRAS_API_KEY not set on server.", "priority": "High", "status": "Error", "assignee": "Admin", "dueDate": ""}]
-
-    try:
-        client = Cerebras(api_key=api_key)
-
-        # Truncate transcript_text if it's too long
-        if len(transcript_text) > MAX_TRANSCRIPT_CHARS:
-            print(f"Original transcript length: {len(transcript_text)} chars. Truncating to {MAX_TRANSCRIPT_CHARS} chars.")
-            truncated_transcript_text = transcript_text[:MAX_TRANSCRIPT_CHARS]
-        else:
-            truncated_transcript_text = transcript_text
-
-        user_prompt = f"""
+USER_PROMPT_TEMPLATE = """
 Transcript:
 ---
-{truncated_transcript_text}
+{transcript}
 ---
 Extract all action items from this transcript and provide them in the specified JSON format.
 """
-        print(f"Sending request to Cerebras API with model: {DEFAULT_MODEL}")
-        # print(f"User prompt (first 200 chars): {user_prompt[:200]}") # For debugging prompt length issues
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=DEFAULT_MODEL,
-            temperature=0.0, # Lowest temperature for maximum determinism
-            max_tokens=4096, 
-        )
-
-        raw_response_content = chat_completion.choices[0].message.content
-        print(f"Raw LLM response content: {raw_response_content}")
-
-        # Attempt to parse the response as JSON
-        # The LLM should ideally return only JSON, but sometimes includes extra text or markdown
-        # Basic cleaning: find the start and end of the JSON list or object
-        json_start_index = raw_response_content.find('[')
-        json_end_index = raw_response_content.rfind(']')
-        
-        if json_start_index != -1 and json_end_index != -1 and json_end_index > json_start_index:
-            json_string = raw_response_content[json_start_index : json_end_index+1]
-            try:
-                tasks = json.loads(json_string)
-                if isinstance(tasks, list):
-                    print(f"Successfully parsed {len(tasks)} tasks from LLM response.")
-                    return tasks
-                else:
-                    print("Error: LLM response was valid JSON but not a list as expected.")
-                    return [{"item": "LLM Formatting Error", "description": "Response was not a JSON list.", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
-            except json.JSONDecodeError as e:
-                print(f"Error decoding JSON from LLM response: {e}")
-                print(f"Problematic JSON string: {json_string}")
-                return [{"item": "LLM JSON Error", "description": f"Could not decode JSON: {e}", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+
+# User-tweaked rules from a re-analyze request
+RULES_PROMPT_TEMPLATE = """
+Additional extraction rules (these take precedence over the defaults):
+{rules}
+"""
+
+# Splits the model's context window between the prompts, the transcript chunk and the reply.
+# Transcripts longer than one chunk are split rather than truncated (see split_transcript).
+prompt_budget = PromptBudget(SYSTEM_PROMPT + USER_PROMPT_TEMPLATE.format(transcript=""))
+
+def _rules_prompt(rules: str = None) -> str:
+    return RULES_PROMPT_TEMPLATE.format(rules=rules) if rules else ""
+
+def split_transcript(transcript_text: str, max_tokens: int = None, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                     rules: str = None) -> list:
+    """
+    Splits transcript text into chunks of at most `max_tokens` (by default, as much as the
+    context window leaves after the prompts, `rules` and the expected reply), breaking on
+    speaker/cue boundaries where possible. Each chunk after the first starts with up to
+    `overlap_tokens` of trailing segments from the previous chunk.
+    """
+    if not transcript_text.strip():
+        return []
+    if max_tokens is None:
+        max_tokens = prompt_budget.input_tokens(_rules_prompt(rules))
+    if count_tokens(transcript_text) <= max_tokens:
+        return [transcript_text]
+
+    # Group lines into segments: one speaker turn, cue or paragraph each
+    segments = []
+    current = []
+    for line in transcript_text.splitlines(keepends=True):
+        if current and (not line.strip() or SPEAKER_LINE_RE.match(line)):
+            segments.append("".join(current))
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        segments.append("".join(current))
+
+    return prompt_budget.pack(segments, max_tokens, overlap_tokens)
+
+def file_block(filename: str, text: str) -> str:
+    """One uploaded file's transcript under the header that marks where it starts in a prompt."""
+    return f"\n\n--- Transcript from: {filename} ---\n\n{text}"
+
+def pack_files(files: list, rules: str = None) -> list:
+    """
+    Groups (filename, text) pairs, in upload order, into lists of filenames whose transcripts
+    fit in one prompt together, so many small files cost one LLM call instead of one each.
+    A file too large for a single chunk gets a group of its own (split by split_transcript).
+    """
+    max_tokens = prompt_budget.input_tokens(_rules_prompt(rules))
+    groups = []
+    run = [] # Consecutive files that fit in a chunk on their own, packed with prompt_budget.pack
+
+    def flush():
+        index = 0
+        for chunk in prompt_budget.pack([block for _, block in run], max_tokens):
+            # Without overlap, each chunk is the next few blocks joined
+            group = []
+            length = 0
+            while length < len(chunk):
+                group.append(run[index][0])
+                length += len(run[index][1])
+                index += 1
+            groups.append(group)
+        run.clear()
+
+    for filename, text in files:
+        block = file_block(filename, text)
+        if count_tokens(block) > max_tokens:
+            flush()
+            groups.append([filename])
         else:
-            print("Error: Could not find valid JSON list in LLM response.")
-            return [{"item": "LLM Response Error", "description": "No valid JSON list found in response.", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+            run.append((filename, block))
+    flush()
+    return groups
+
+def split_files(files: list, rules: str = None) -> list:
+    """Chunks for a multi-file upload: pack_files groups, each split with split_transcript."""
+    files = dict(files)
+    chunks = []
+    for group in pack_files(list(files.items()), rules):
+        chunks.extend(split_transcript("".join(file_block(name, files[name]) for name in group), rules=rules))
+    return chunks
+
+def is_error_result(tasks: list) -> bool:
+    """True for the single-item error lists returned by `_extract_chunk`."""
+    return len(tasks) == 1 and isinstance(tasks[0], dict) and tasks[0].get("status") == "Error"
+
+def _build_messages(chunk_text: str, rules: str = None) -> list:
+    user_prompt = USER_PROMPT_TEMPLATE.format(transcript=chunk_text) + _rules_prompt(rules)
+    # print(f"User prompt (first 200 chars): {user_prompt[:200]}") # For debugging prompt length issues
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def chunk_cache_key(chunk_text: str, rules: str = None) -> str:
+    """Cache key of one chunk's extraction; extra rules count as part of the prompt."""
+    return make_cache_key(chunk_text, DEFAULT_MODEL, SYSTEM_PROMPT + (rules or ""))
+
+def _reply_budget(chunk_text: str, rules: str = None) -> tuple:
+    """Returns (max_tokens, prompt_tokens) for a chunk: the reply is sized from the tasks it is expected to hold."""
+    chunk_tokens = count_tokens(chunk_text)
+    prompt_tokens = prompt_budget.fixed_tokens + chunk_tokens + (cached_token_count(_rules_prompt(rules)) if rules else 0)
+    return prompt_budget.max_tokens(prompt_tokens, chunk_tokens), prompt_tokens
+
+def _extract_chunk(client, chunk_text: str, rules: str = None) -> list:
+    """Sends one transcript chunk to the model and parses the JSON task list from its reply."""
+    try:
+        logger.info("Sending request to %s API with model: %s (%d chars)", LLM_PROVIDER, DEFAULT_MODEL, len(chunk_text))
+
+        with metrics.span("prompt_build") as sizes:
+            messages = _build_messages(chunk_text, rules)
+            max_tokens, sizes["tokens"] = _reply_budget(chunk_text, rules)
+            sizes["chars"] = sum(len(message["content"]) for message in messages)
+        with metrics.span("llm_round_trip", mode="sync") as sizes:
+            raw_response_content = client.chat(
+                messages=messages,
+                model=DEFAULT_MODEL,
+                temperature=0.0, # Lowest temperature for maximum determinism
+                max_tokens=max_tokens,
+            )
+            sizes["chars"] = len(raw_response_content or "")
+        logger.debug("Raw LLM response content: %s", raw_response_content)
+        with metrics.span("json_extract") as sizes:
+            sizes["chars"] = len(raw_response_content or "")
+            tasks = _parse_task_list(raw_response_content)
+            if not is_error_result(tasks):
+                sizes["tasks"] = len(tasks)
+        return tasks
 
     except Exception as e:
-        print(f"An error occurred while calling the Cerebras API: {e}")
+        logger.error("An error occurred while calling the %s API: %s", LLM_PROVIDER, e)
         # Return an error task to be displayed on the frontend
-        return [{"item": "API Call Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}] 
\ No newline at end of file
+        return [{"item": "API Call Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+
+def _parse_task_list(raw_response_content: str) -> list:
+    """Parses the JSON task list out of a model reply, or returns a single-item error list."""
+    # Attempt to parse the response as JSON
+    # The LLM should ideally return only JSON, but sometimes includes extra text or markdown
+    # Basic cleaning: find the start and end of the JSON list or object
+    json_start_index = raw_response_content.find('[')
+    json_end_index = raw_response_content.rfind(']')
+    
+    if json_start_index != -1 and json_end_index != -1 and json_end_index > json_start_index:
+        json_string = raw_response_content[json_start_index : json_end_index+1]
+        try:
+            tasks = json.loads(json_string)
+            if isinstance(tasks, list):
+                logger.info("Successfully parsed %d tasks from LLM response.", len(tasks))
+                return tasks
+            else:
+                logger.error("LLM response was valid JSON but not a list as expected.")
+                return [{"item": "LLM Formatting Error", "description": "Response was not a JSON list.", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding JSON from LLM response: %s", e)
+            logger.debug("Problematic JSON string: %s", json_string)
+            return [{"item": "LLM JSON Error", "description": f"Could not decode JSON: {e}", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+    else:
+        logger.error("Could not find valid JSON list in LLM response.")
+        return [{"item": "LLM Response Error", "description": "No valid JSON list found in response.", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+
+def merge_chunk_results(chunk_results: list) -> list:
+    """
+    Merges per-chunk task lists in chunk order, dropping tasks repeated by the chunk overlap.
+    If every chunk failed, the first chunk's error is returned so app.py reports it as before.
+    If only some failed, a System error entry naming them comes first, so the partial result
+    is not mistaken for a complete one.
+    """
+    merged = []
+    failures = []
+    for index, tasks in enumerate(chunk_results):
+        if is_error_result(tasks):
+            failures.append(f"chunk {index + 1}: {tasks[0].get('description')}")
+            logger.warning("Chunk %d/%d failed: %s", index + 1, len(chunk_results), tasks[0].get('description'))
+            continue
+        merged.extend(tasks)
+    if chunk_results and len(failures) == len(chunk_results):
+        return chunk_results[0]
+    with metrics.span("dedupe", scope="chunks") as sizes:
+        sizes["tasks"] = len(merged)
+        merged = utils.dedupe_tasks(merged)
+    if failures:
+        merged.insert(0, {
+            "item": "Partial Extraction",
+            "description": f"{len(failures)} of {len(chunk_results)} transcript chunks failed and were not analyzed: " + "; ".join(failures),
+            "priority": "High", "status": "Error", "assignee": "System", "dueDate": "", "confidence": "High"
+        })
+    return merged
+
+def extract_chunk_results(chunks: list, rules: str = None) -> list:
+    """
+    Extracts tasks from each chunk, returning one task list per chunk in the same order.
+    Chunks already extracted with the same model, prompt and rules are served from
+    extraction_cache; the rest are sent concurrently (up to MAX_LLM_WORKERS at a time).
+    A chunk that fails gets a single-item error list.
+    """
+    cache_keys = [chunk_cache_key(chunk, rules) for chunk in chunks]
+    chunk_results = [extraction_cache.get(key) for key in cache_keys]
+    pending = [index for index, result in enumerate(chunk_results) if result is None]
+    if len(pending) < len(chunks):
+        logger.info("Extraction cache hit for %d/%d chunk(s).", len(chunks) - len(pending), len(chunks))
+    if not pending:
+        return chunk_results
+
+    try:
+        # Shared, process-wide client: pooled connections, rate limiting and retries
+        client = get_llm_client(LLM_PROVIDER)
+    except LLMConfigurationError as e:
+        logger.error("LLM client not configured: %s", e)
+        # Returning an error structure that the frontend can display
+        error = [{"item": "Configuration Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "Admin", "dueDate": ""}]
+        return [result if result is not None else error for result in chunk_results]
+    except Exception as e:
+        logger.error("An error occurred while creating the %s client: %s", LLM_PROVIDER, e)
+        error = [{"item": "API Call Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+        return [result if result is not None else error for result in chunk_results]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_LLM_WORKERS, len(pending)))) as executor:
+        fresh_results = executor.map(lambda index: _extract_chunk(client, chunks[index], rules), pending)
+        for index, tasks in zip(pending, fresh_results):
+            chunk_results[index] = tasks
+            # Errors are transient (rate limits, bad JSON) and must not be served again
+            if not is_error_result(tasks):
+                extraction_cache.put(cache_keys[index], tasks)
+    return chunk_results
+
+def extract_tasks_from_transcript(transcript_text: str, rules: str = None) -> list:
+    """
+    Sends the transcript text to the LLM (Cerebras by default) and attempts to extract tasks.
+    Transcripts longer than the prompt budget allows are split into overlapping chunks that are
+    processed concurrently and merged (see extract_chunk_results).
+    Returns a list of task dictionaries or an empty list if an error occurs or no tasks are found.
+    """
+    chunks = split_transcript(transcript_text, rules=rules) or [transcript_text]
+    if len(chunks) > 1:
+        logger.info("Transcript length: %d chars. Split into %d chunks for extraction.", len(transcript_text), len(chunks))
+    chunk_results = extract_chunk_results(chunks, rules)
+    if len(chunk_results) == 1:
+        return chunk_results[0]
+    return merge_chunk_results(chunk_results)
+
+
+def _stream_chunk(client, chunk_text: str, emit) -> list:
+    """
+    Streams one chunk's reply, calling emit(("task", task)) for each task object as soon as it
+    is complete. Returns the chunk's full task list, or a single-item error list if the reply
+    was not a complete, valid JSON list (e.g. cut off by max_tokens).
+    """
+    parser = utils.JSONArrayStreamParser()
+    tasks = []
+    try:
+        logger.info("Streaming request to %s API with model: %s (%d chars)", LLM_PROVIDER, DEFAULT_MODEL, len(chunk_text))
+        with metrics.span("prompt_build") as sizes:
+            messages = _build_messages(chunk_text)
+            max_tokens, sizes["tokens"] = _reply_budget(chunk_text)
+            sizes["chars"] = sum(len(message["content"]) for message in messages)
+        # JSON extraction happens piecewise inside the stream, so it is timed as part of the round trip
+        with metrics.span("llm_round_trip", mode="stream") as sizes:
+            for piece in client.chat_stream(
+                messages=messages,
+                model=DEFAULT_MODEL,
+                temperature=0.0, # Lowest temperature for maximum determinism
+                max_tokens=max_tokens,
+            ):
+                sizes["chars"] = sizes.get("chars", 0) + len(piece)
+                for task in parser.feed(piece):
+                    tasks.append(task)
+                    emit(("task", task))
+                if parser.finished:
+                    break
+            sizes["tasks"] = len(tasks)
+    except Exception as e:
+        logger.error("An error occurred while streaming from the %s API: %s", LLM_PROVIDER, e)
+        error = [{"item": "API Call Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+        emit(("error", error[0]))
+        return error
+
+    for parse_error in parser.errors:
+        logger.error("Error decoding a task object from the LLM stream: %s", parse_error)
+    # Only a closed, fully valid array is a result; anything else must not be cached or stored
+    if not parser.started:
+        logger.error("Could not find valid JSON list in LLM response.")
+        error = [{"item": "LLM Response Error", "description": "No valid JSON list found in response.", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+    elif parser.errors:
+        error = [{"item": "LLM JSON Error", "description": f"Could not decode JSON: {parser.errors[0]}", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+    elif not parser.finished:
+        logger.error("LLM stream ended before the JSON list was closed (%d tasks received).", len(tasks))
+        error = [{"item": "LLM Response Error", "description": f"Response was cut off after {len(tasks)} task(s); the JSON list was not closed.", "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""}]
+    else:
+        logger.info("Streamed %d tasks from LLM response.", len(tasks))
+        return tasks
+    emit(("error", error[0]))
+    return error
+
+def stream_tasks_from_transcript(transcript_text: str):
+    """Streaming counterpart of extract_tasks_from_transcript (see stream_tasks_from_chunks)."""
+    yield from stream_tasks_from_chunks(split_transcript(transcript_text) or [transcript_text])
+
+def stream_tasks_from_chunks(chunks: list):
+    """
+    Yields ("task", task_dict) as each task object closes in the model output, de-duplicated
+    across chunks, and ("error", error_task) for chunks or configuration problems that fail.
+    Cached chunks are yielded first; the others stream concurrently on MAX_LLM_WORKERS threads.
+    """
+    cache_keys = [chunk_cache_key(chunk) for chunk in chunks]
+    deduper = utils.TaskDeduper()
+
+    def first_sighting(task):
+        item_text = task.get("item") if isinstance(task, dict) else None
+        if not isinstance(item_text, str):
+            return True # Let validation report it
+        return deduper.add(item_text)
+
+    pending = []
+    for index, key in enumerate(cache_keys):
+        cached = extraction_cache.get(key)
+        if cached is None:
+            pending.append(index)
+            continue
+        for task in cached:
+            if first_sighting(task):
+                yield ("task", task)
+    if not pending:
+        return
+
+    try:
+        client = get_llm_client(LLM_PROVIDER)
+    except LLMConfigurationError as e:
+        logger.error("LLM client not configured: %s", e)
+        yield ("error", {"item": "Configuration Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "Admin", "dueDate": ""})
+        return
+    except Exception as e:
+        logger.error("An error occurred while creating the %s client: %s", LLM_PROVIDER, e)
+        yield ("error", {"item": "API Call Error", "description": str(e), "priority": "High", "status": "Error", "assignee": "System", "dueDate": ""})
+        return
+
+    events = queue.Queue()
+
+    def run_chunk(index):
+        try:
+            tasks = _stream_chunk(client, chunks[index], events.put)
+            if not is_error_result(tasks):
+                extraction_cache.put(cache_keys[index], tasks)
+        finally:
+            events.put(("chunk_done", None))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_LLM_WORKERS, len(pending))))
+    try:
+        for index in pending:
+            executor.submit(run_chunk, index)
+        remaining = len(pending)
+        while remaining:
+            kind, payload = events.get()
+            if kind == "chunk_done":
+                remaining -= 1
+            elif kind == "error" or first_sighting(payload):
+                yield (kind, payload)
+    finally:
+        # If the client disconnects, stop starting new chunks; in-flight ones finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,12 +1,13 @@
 import os
-import openai
 import utils
+from llm_pool import get_llm_client
 
 def extract_actions(text: str) -> list:
     prompt = utils.load_prompt_template()
-    resp = openai.ChatCompletion.create(
+    # Shared OpenAI client from llm_pool: pooled connections, rate limiting and retries
+    content = get_llm_client("openai").chat(
         model="gpt-4o",
         messages=[{"role":"system","content":prompt}, {"role":"user","content":text}],
         temperature=0.0,
     )
-    return utils.parse_json(resp.choices[0].message.content)
+    return utils.parse_json(content)
@@ -0,0 +1,336 @@
+import os
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Process-wide LLM client layer: one long-lived SDK client per provider (keep-alive HTTP
+# connections are reused across requests), a token-bucket rate limiter shared by every
+# thread in the process, and jittered exponential retries within a per-call time budget.
+
+LLM_RATE_LIMIT_RPS = float(os.environ.get("LLM_RATE_LIMIT_RPS", 5))
+LLM_RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", 10))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE_SECONDS = float(os.environ.get("LLM_BACKOFF_BASE_SECONDS", 0.5))
+LLM_BACKOFF_MAX_SECONDS = float(os.environ.get("LLM_BACKOFF_MAX_SECONDS", 8))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 60))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", 20))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMConfigurationError(Exception):
+    """The provider cannot be used (missing API key, SDK not installed, unknown provider)."""
+
+class LLMTimeoutError(Exception):
+    """The per-call time budget ran out before a successful response."""
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Blocks until a token is available. Returns False if none arrives within `timeout` seconds."""
+        if self.rate <= 0:
+            return True # Rate limiting disabled
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = getattr(exc.response, "status_code", None)
+    return status
+
+def is_retryable(exc) -> bool:
+    """429/5xx responses, connection errors and timeouts are retried; other errors are not."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    name = type(exc).__name__
+    return "Connection" in name or "Timeout" in name or isinstance(exc, (ConnectionError, TimeoutError))
+
+def _retry_after(exc):
+    # Honour the server's Retry-After header (seconds) when present
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class LLMBackend:
+    """Provider adapter. Subclasses turn a chat request into the assistant's reply text."""
+
+    name = "base"
+
+    def chat(self, messages: list, model: str, temperature: float, max_tokens: int, timeout: float) -> str:
+        raise NotImplementedError
+
+    def chat_stream(self, messages: list, model: str, temperature: float, max_tokens: int, timeout: float):
+        """Yields the reply text in pieces as the model generates it. Defaults to one piece."""
+        yield self.chat(messages, model, temperature, max_tokens, timeout)
+
+class CerebrasBackend(LLMBackend):
+    name = "cerebras"
+
+    def __init__(self, api_key: str = None):
+        api_key = api_key or os.environ.get("CEREBRAS_API_KEY")
+        if not api_key:
+            raise LLMConfigurationError("CEREBRAS_API_KEY not set on server.")
+        import httpx
+        from cerebras.cloud.sdk import Cerebras
+        # Retries are handled by LLMClient so that they share the rate limiter and time budget
+        self._client = Cerebras(
+            api_key=api_key,
+            max_retries=0,
+            http_client=httpx.Client(limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                                         max_keepalive_connections=LLM_MAX_CONNECTIONS)),
+        )
+
+    def chat(self, messages, model, temperature, max_tokens, timeout):
+        completion = self._client.chat.completions.create(
+            messages=messages, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout,
+        )
+        metrics.record_llm_usage(self.name, getattr(completion, "usage", None))
+        return completion.choices[0].message.content
+
+    def chat_stream(self, messages, model, temperature, max_tokens, timeout):
+        stream = self._client.chat.completions.create(
+            messages=messages, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key: str = None):
+        api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise LLMConfigurationError("OPENAI_API_KEY not set on server.")
+        try:
+            import openai
+        except ImportError as e:
+            raise LLMConfigurationError("The openai package is not installed.") from e
+        self._openai = openai
+        # openai>=1.0 has a reusable client object; older releases only expose module-level calls
+        self._client = openai.OpenAI(api_key=api_key, max_retries=0) if hasattr(openai, "OpenAI") else None
+        if self._client is None:
+            openai.api_key = api_key
+
+    def chat(self, messages, model, temperature, max_tokens, timeout):
+        if self._client is not None:
+            completion = self._client.chat.completions.create(
+                messages=messages, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout,
+            )
+        else:
+            completion = self._openai.ChatCompletion.create(
+                messages=messages, model=model, temperature=temperature, max_tokens=max_tokens, request_timeout=timeout,
+            )
+        metrics.record_llm_usage(self.name, getattr(completion, "usage", None))
+        return completion.choices[0].message.content
+
+    def chat_stream(self, messages, model, temperature, max_tokens, timeout):
+        if self._client is None:
+            yield self.chat(messages, model, temperature, max_tokens, timeout)
+            return
+        stream = self._client.chat.completions.create(
+            messages=messages, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class FakeHTTPError(Exception):
+    """Error raised by FakeBackend to simulate an HTTP failure with a status code."""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"HTTP {status_code}")
+        self.status_code = status_code
+
+# "Name: I will ...", "Name: I'll ...", "Name: I can take ..." commitments recognised by FakeBackend
+_FAKE_COMMITMENT_RE = re.compile(r"^(?:\[[\d:]+\] )?([A-Z][\w .'-]{0,40}):\s+(?:I will|I'll|I can take)\s+(.+)$", re.MULTILINE)
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic local stand-in for a model, for tests and benchmarks.
+    Each "Name: I will <something>" line in the prompt becomes one task. `latency` seconds are
+    slept per call, and `failures` is a list of status codes raised (in order) before succeeding.
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, failures: list = None, responder=None):
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.responder = responder
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _reply(self, messages) -> str:
+        with self._lock:
+            self.calls += 1
+            failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise FakeHTTPError(failure)
+        prompt = messages[-1]["content"]
+        if self.responder is not None:
+            return self.responder(prompt)
+        return json.dumps(self.tasks_for(prompt))
+
+    def chat(self, messages, model, temperature, max_tokens, timeout):
+        if self.latency:
+            time.sleep(min(self.latency, timeout) if timeout else self.latency)
+        return self._reply(messages)
+
+    def chat_stream(self, messages, model, temperature, max_tokens, timeout):
+        # Spread the latency over the reply, one task object per piece, like a generating model
+        content = self._reply(messages)
+        pieces = content.split("}, ") if content.startswith("[{") else [content]
+        for index, piece in enumerate(pieces):
+            if self.latency:
+                time.sleep(self.latency / len(pieces))
+            yield piece + ("}, " if index < len(pieces) - 1 else "")
+
+    @staticmethod
+    def tasks_for(prompt: str) -> list:
+        tasks = []
+        for speaker, commitment in _FAKE_COMMITMENT_RE.findall(prompt):
+            commitment = commitment.strip().rstrip(".")
+            tasks.append({
+                "item": commitment[:1].upper() + commitment[1:],
+                "assignee": speaker.strip(),
+                "priority": "Medium",
+                "status": "Todo",
+                "dueDate": "TBD",
+                "description": f"{speaker.strip()} will {commitment}.",
+                "source_excerpt": f"{speaker.strip()}: I will {commitment}",
+                "confidence": "High",
+            })
+        return tasks
+
+class LLMClient:
+    """Rate-limited, retrying front end for an LLMBackend. Safe to share between threads."""
+
+    def __init__(self, backend: LLMBackend, rate_limiter: TokenBucket = None, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE_SECONDS, backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+                 timeout: float = LLM_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.rate_limiter = rate_limiter or TokenBucket(LLM_RATE_LIMIT_RPS, LLM_RATE_LIMIT_BURST)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+    def chat(self, messages: list, model: str, temperature: float = 0.0, max_tokens: int = 4096, timeout: float = None) -> str:
+        """
+        Returns the reply text. Retryable failures are retried with full-jitter exponential
+        backoff until max_retries or the `timeout` budget (covering all attempts) runs out.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.rate_limiter.acquire(timeout=remaining):
+                raise LLMTimeoutError(f"LLM call exceeded its {timeout or self.timeout:.0f}s budget.")
+            try:
+                return self.backend.chat(messages, model, temperature, max_tokens, timeout=deadline - time.monotonic())
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                logger.warning("LLM call to %s failed (%s); retry %d/%d in %.2fs.", self.backend.name, e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+
+    def chat_stream(self, messages: list, model: str, temperature: float = 0.0, max_tokens: int = 4096, timeout: float = None):
+        """
+        Streaming variant of chat(). Failures before the first piece arrives are retried like
+        chat(); once text has been yielded, errors propagate to the caller.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.rate_limiter.acquire(timeout=remaining):
+                raise LLMTimeoutError(f"LLM call exceeded its {timeout or self.timeout:.0f}s budget.")
+            received = False
+            try:
+                for piece in self.backend.chat_stream(messages, model, temperature, max_tokens,
+                                                      timeout=deadline - time.monotonic()):
+                    received = True
+                    yield piece
+                return
+            except Exception as e:
+                if received or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                logger.warning("LLM stream from %s failed (%s); retry %d/%d in %.2fs.", self.backend.name, e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+
+_BACKENDS = {
+    "cerebras": CerebrasBackend,
+    "openai": OpenAIBackend,
+    "fake": FakeBackend,
+}
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(provider: str = "cerebras") -> LLMClient:
+    """Returns the process-wide LLMClient for `provider`, creating it on first use."""
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if provider not in _clients:
+            backend_cls = _BACKENDS.get(provider)
+            if backend_cls is None:
+                raise LLMConfigurationError(f"Unknown LLM provider: {provider}")
+            _clients[provider] = LLMClient(backend_cls())
+        return _clients[provider]
+
+def set_llm_client(provider: str, client: LLMClient):
+    """Installs `client` as the process-wide client for `provider` (e.g. a FakeBackend in tests)."""
+    with _clients_lock:
+        _clients[provider] = client
+
+def reset_llm_clients():
+    with _clients_lock:
+        _clients.clear()
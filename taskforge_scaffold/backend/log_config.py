@@ -0,0 +1,38 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# Level of the backend's log output (DEBUG, INFO, WARNING, ERROR)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+
+_listener = None
+
+def _start_listener(log_queue, handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+def configure_logging(level: str = LOG_LEVEL):
+    """
+    Routes all backend logging through a QueueHandler, so request threads only enqueue records
+    and a single listener thread formats and writes them to stderr. Safe to call more than once.
+    """
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level, logging.INFO))
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _start_listener(log_queue, handler)
+    atexit.register(lambda: _listener.stop())
+
+    # The listener thread does not survive fork (gunicorn --preload): start a new one in each child
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: _start_listener(log_queue, handler))
@@ -0,0 +1,170 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process metrics served in the Prometheus text format at GET /api/metrics.
+# Each gunicorn worker keeps its own registry, so scrape every worker (or run one worker with threads).
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the stage latency histogram buckets: sub-millisecond parsing up to slow LLM calls
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Sizes a span may report; each becomes a taskforge_stage_<unit>_total counter
+SPAN_UNITS = ("bytes", "chars", "tokens", "tasks")
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = label_key + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    """Monotonic counter with one series per label combination."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Gauge:
+    """Value that can go up and down, with one series per label combination."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    """
+    Fixed-bucket histogram with one series per label combination. observe() is a bisect and
+    a few integer increments under a lock; cumulative bucket counts are only built on render().
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict:
+        """{label key: (per-bucket counts, sum, count)}, copied under the lock."""
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+STAGE_SECONDS = Histogram("taskforge_stage_duration_seconds",
+                          "Time spent in each pipeline stage (parse, prompt_build, llm_round_trip, ...).")
+STAGE_ERRORS = Counter("taskforge_stage_errors_total", "Pipeline stage spans that ended with an exception.")
+STAGE_SIZES = {unit: Counter(f"taskforge_stage_{unit}_total", f"Total {unit} processed by each pipeline stage.")
+               for unit in SPAN_UNITS}
+LLM_TOKENS = Counter("taskforge_llm_tokens_total", "Tokens reported by the LLM provider, by kind (prompt/completion).")
+STARTUP_SECONDS = Gauge("taskforge_startup_seconds",
+                        "Cold start of this process by phase: import, warm (create_app) and first_request.")
+
+@contextmanager
+def span(stage: str, **labels):
+    """
+    Times a pipeline stage into STAGE_SECONDS. Yields a dict the caller fills with sizes
+    (keys from SPAN_UNITS, e.g. sizes["chars"] = len(text)), added to the matching counters.
+    Extra labels (e.g. format="pdf") split the stage into separate series.
+    """
+    sizes = {}
+    start = time.perf_counter()
+    try:
+        yield sizes
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage, **labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, **labels)
+        for unit, amount in sizes.items():
+            counter = STAGE_SIZES.get(unit)
+            if counter is not None and amount:
+                counter.inc(amount, stage=stage, **labels)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("span %s %s took %.1f ms %s", stage, labels or "", elapsed * 1000, sizes)
+
+def record_llm_usage(provider: str, usage):
+    """Adds a provider response's token usage (an object with prompt_tokens/completion_tokens) to LLM_TOKENS."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, provider=provider, kind=kind)
+
+def _render_gauges(gauges: dict) -> list:
+    lines = []
+    for name, (help_text, value, *metric_type) in gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type[0] if metric_type else 'gauge'}")
+        lines.append(f"{name} {float(value)}")
+    return lines
+
+def render_prometheus(gauges: dict = None) -> str:
+    """
+    Renders every metric in the Prometheus text exposition format (version 0.0.4).
+    `gauges` maps extra metric names to (help text, current value), e.g. cache sizes;
+    a third tuple item overrides the "gauge" type (for counters kept elsewhere).
+    """
+    lines = []
+    for metric in (STARTUP_SECONDS, STAGE_SECONDS, STAGE_ERRORS, *STAGE_SIZES.values(), LLM_TOKENS):
+        lines.extend(metric.render())
+    lines.extend(_render_gauges(gauges or {}))
+    return "\n".join(lines) + "\n"
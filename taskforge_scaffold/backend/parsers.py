@@ -1,70 +1,320 @@
 import io
-import webvtt
-from docx import Document # Import Document for docx parsing
-from PyPDF2 import PdfReader # Import PdfReader for pdf parsing
+import logging
+import os
+import re
+from contextlib import contextmanager
+# python-docx and PyPDF2 are imported by the parser that needs them, on first use,
+# so importing this module (and starting the app) does not pay for them.
 # Removed UploadFile type hint as it's specific to async frameworks like FastAPI/Starlette
 # For Flask, the file object from request.files is a FileStorage object
+from werkzeug.datastructures import FileStorage
 
-def parse_transcript(file_storage) -> str:
-    filename = file_storage.filename
-    print(f"Attempting to parse: {filename}")
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-file ceiling on extracted characters. Parsing stops (and later pages are never read)
+# once a file has produced this much text, which bounds memory per upload.
+MAX_PARSE_CHARS = int(os.environ.get('MAX_PARSE_CHARS', 2_000_000))
+
+# Prefix each merged speaker turn with its start time ("[00:12:03] Alice: ...").
+# Off by default: speaker labels are enough for the LLM and timestamps cost tokens.
+TRANSCRIPT_TIMESTAMPS = os.environ.get('TRANSCRIPT_TIMESTAMPS', 'False').lower() == 'true'
+
+# Longest speaker turn merge_cues builds from consecutive cues; a long monologue becomes
+# several lines, so chunking can still break inside it
+MAX_TURN_CHARS = 2000
+
+SRT_TIMING_RE = re.compile(r'(\d+:)?(\d{1,2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d+:)?(\d{1,2}):(\d{2})[,.](\d{1,3})')
+VOICE_TAG_RE = re.compile(r'<v(?:\.[^\s>]*)?\s+([^>]+)>')
+CUE_MARKUP_RE = re.compile(r'<[^>]*>|\{\\[^}]*\}') # <i>, <c.yellow>, </v>, {\an8}
+SPEAKER_PREFIX_RE = re.compile(r"^(?:>>\s*|-\s*)?([A-Z][\w .'-]{0,40}):\s+")
+DIALOGUE_DASH_RE = re.compile(r'^(?:>>|-)\s') # "- Yes." / ">> Yes.": a new, unnamed speaker
+
+class Cue:
+    """One caption cue: start/end in seconds (None if unknown), speaker label (None if unknown) and text."""
+    __slots__ = ('start', 'end', 'speaker', 'text')
+
+    def __init__(self, start, end, speaker, text):
+        self.start = start
+        self.end = end
+        self.speaker = speaker
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue(start={self.start!r}, end={self.end!r}, speaker={self.speaker!r}, text={self.text!r})"
+
+def _make_cue(start, end, raw_text):
+    """Builds a Cue from raw caption text, pulling the speaker from a <v> tag or "Name:" prefix."""
+    speaker = None
+    voice = VOICE_TAG_RE.search(raw_text)
+    if voice:
+        speaker = voice.group(1).strip()
+    text = ' '.join(CUE_MARKUP_RE.sub('', raw_text).split())
+    prefix = SPEAKER_PREFIX_RE.match(text)
+    if prefix:
+        speaker = speaker or prefix.group(1).strip()
+        text = text[prefix.end():]
+    return Cue(start, end, speaker, text)
+
+def _make_cues(start, end, lines):
+    """
+    Builds the Cue records of one caption block. Each line with its own speaker (<v> tag,
+    "Name:" or "- Name:" prefix) or dialogue dash starts a new Cue, so two people sharing a
+    cue stay separate turns; other lines continue the previous one (wrapped text).
+    """
+    cues = []
+    for line in lines:
+        cue = _make_cue(start, end, line)
+        if cues and cue.speaker is None and not DIALOGUE_DASH_RE.match(cue.text):
+            cues[-1].text = f"{cues[-1].text} {cue.text}".strip()
+        else:
+            cues.append(cue)
+    return cues
+
+def _srt_seconds(hours, minutes, seconds, millis):
+    return int(hours[:-1] if hours else 0) * 3600 + int(minutes) * 60 + int(seconds) + int(millis.ljust(3, '0')) / 1000
+
+def merge_cues(cues):
+    """
+    Merges consecutive cues from the same known speaker into turns of up to MAX_TURN_CHARS.
+    Cues without a speaker label stay one line each.
+    """
+    current = None
+    for cue in cues:
+        if not cue.text:
+            continue
+        if (current is not None and cue.speaker is not None and cue.speaker == current.speaker
+                and len(current.text) + len(cue.text) < MAX_TURN_CHARS):
+            current.text += ' ' + cue.text
+            current.end = cue.end if cue.end is not None else current.end
+            continue
+        if current is not None:
+            yield current
+        current = Cue(cue.start, cue.end, cue.speaker, cue.text)
+    if current is not None:
+        yield current
+
+def format_timestamp(seconds) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def format_cue(cue, with_timestamp: bool = TRANSCRIPT_TIMESTAMPS) -> str:
+    """Compact prompt line for a cue: "[hh:mm:ss] Speaker: text", without timing noise."""
+    line = f"{cue.speaker}: {cue.text}" if cue.speaker else cue.text
+    if with_timestamp and cue.start is not None:
+        line = f"[{format_timestamp(cue.start)}] {line}"
+    return line
+
+@contextmanager
+def _text_stream(file_storage):
+    """
+    Decoding view over the uploaded stream, without copying it into a new buffer.
+    A UTF-8 byte order mark (common in files from Windows tools) is dropped.
+    The wrapper is detached afterwards so the upload's own stream stays open.
+    """
+    file_storage.seek(0)
+    wrapper = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', errors='ignore', newline=None)
+    try:
+        yield wrapper
+    finally:
+        wrapper.detach()
+
+def _iter_plain_text(file_storage):
+    with _text_stream(file_storage) as stream:
+        for line in stream:
+            yield line.rstrip('\n')
+
+def _iter_caption_blocks(lines, timed_only: bool):
+    """
+    Streams blank-line separated caption blocks as Cue records (several per block when it
+    holds more than one speaker, see _make_cues). Lines before a block's timing
+    line (SRT sequence numbers, VTT cue identifiers) are skipped. With timed_only, blocks
+    without a timing line (VTT header, NOTE, STYLE and REGION blocks) are skipped as well.
+    """
+    start = end = None
+    text_lines = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if text_lines:
+                yield from _make_cues(start, end, text_lines)
+            start = end = None
+            text_lines = []
+            continue
+        timing = SRT_TIMING_RE.match(line)
+        if timing and not text_lines:
+            groups = timing.groups()
+            start = _srt_seconds(*groups[:4])
+            end = _srt_seconds(*groups[4:])
+        elif start is None and not text_lines and (timed_only or line.isdigit()):
+            continue # Sequence number, cue identifier or untimed VTT block
+        else:
+            text_lines.append(line)
+    if text_lines:
+        yield from _make_cues(start, end, text_lines)
 
+def _iter_srt_cues(file_storage):
+    """Streams SRT blocks (sequence number, timing line, text lines) as Cue records."""
+    with _text_stream(file_storage) as stream:
+        yield from _iter_caption_blocks(stream, timed_only=False)
+
+def _iter_vtt_cues(file_storage):
+    """Streams WebVTT cues as Cue records. Raises ValueError if the WEBVTT header is missing."""
+    with _text_stream(file_storage) as stream:
+        if not stream.readline().startswith('WEBVTT'):
+            raise ValueError("Missing WEBVTT header")
+        yield from _iter_caption_blocks(stream, timed_only=True)
+
+def iter_cues(file_storage):
+    """
+    Yields Cue records for a .vtt or .srt upload, merged into speaker turns.
+    Raises ValueError for other file types.
+    """
+    filename = file_storage.filename
     if filename.endswith('.vtt'):
-        try:
-            # Reset stream position in case it was read before
-            file_storage.seek(0) 
-            reader = webvtt.read_buffer(io.BytesIO(file_storage.read()))
-            text = "\n".join([cue.text for cue in reader])
-            print("Parsed VTT successfully.")
-            return text
-        except Exception as e:
-            print(f"Error parsing VTT file {filename}: {e}. Trying raw text.")
-            # Fallback to reading as text if VTT parsing fails
-            file_storage.seek(0)
-            return file_storage.read().decode(errors='ignore')
-
-    elif filename.endswith('.txt') or filename.endswith('.srt'): # Treat SRT as plain text for now
-        try:
-            file_storage.seek(0)
-            text = file_storage.read().decode(errors='ignore')
-            print(f"Parsed {filename.split('.')[-1].upper()} as plain text.")
-            return text
-        except Exception as e:
-            print(f"Error reading text file {filename}: {e}")
-            raise # Re-raise the exception if basic text reading fails
-    
-    elif filename.endswith('.docx'):
-        try:
-            file_storage.seek(0)
-            # python-docx reads directly from a file-like object
-            document = Document(file_storage)
-            full_text = []
-            for para in document.paragraphs:
-                full_text.append(para.text)
-            text = '\n'.join(full_text)
-            print("Parsed DOCX successfully.")
-            return text
-        except Exception as e:
-            print(f"Error parsing DOCX file {filename}: {e}")
-            # Optionally return empty string or raise error
-            # For now, raise error to be caught in app.py
-            raise ValueError(f"Could not parse DOCX file: {e}") from e
+        return merge_cues(_iter_vtt_cues(file_storage))
+    if filename.endswith('.srt'):
+        return merge_cues(_iter_srt_cues(file_storage))
+    raise ValueError(f"Not a caption file: {filename}")
 
-    elif filename.endswith('.pdf'):
-        try:
-            file_storage.seek(0)
-            reader = PdfReader(file_storage)
-            full_text = []
-            for page in reader.pages:
-                full_text.append(page.extract_text() or "") # Add fallback for empty pages
-            text = "\n".join(full_text)
-            print(f"Parsed PDF successfully ({len(reader.pages)} pages).")
-            return text
-        except Exception as e:
-            print(f"Error parsing PDF file {filename}: {e}")
-            raise ValueError(f"Could not parse PDF file: {e}") from e
+def _iter_captions(file_storage):
+    filename = file_storage.filename
+    kind = filename.split('.')[-1].upper()
+    turns = iter_cues(file_storage)
+    try:
+        # Cues stream lazily; only the first turn is read up front, so a malformed file
+        # can still fall back to raw text before anything is yielded
+        first = next(turns, None)
+    except Exception as e:
+        logger.warning("Error parsing %s file %s: %s. Trying raw text.", kind, filename, e)
+        # Fallback to reading as text if caption parsing fails
+        yield from _iter_plain_text(file_storage)
+        return
+    if first is None:
+        return
+    count = 1
+    try:
+        yield format_cue(first)
+        for cue in turns:
+            count += 1
+            yield format_cue(cue)
+    finally:
+        turns.close() # Closes the decoding stream when the character limit stops parsing early
+    logger.info("Parsed %s successfully (%d speaker turns).", kind, count)
+
+def _iter_docx(file_storage):
+    try:
+        from docx import Document # Import Document for docx parsing
+        file_storage.seek(0)
+        # python-docx reads directly from a file-like object
+        document = Document(file_storage)
+        for para in document.paragraphs:
+            yield para.text
+        logger.info("Parsed DOCX successfully.")
+    except Exception as e:
+        logger.error("Error parsing DOCX file %s: %s", file_storage.filename, e)
+        # Raise error to be caught in app.py
+        raise ValueError(f"Could not parse DOCX file: {e}") from e
+
+def _iter_pdf(file_storage):
+    try:
+        from PyPDF2 import PdfReader # Import PdfReader for pdf parsing
+        file_storage.seek(0)
+        reader = PdfReader(file_storage)
+        # Pages are extracted one at a time as the consumer asks for them
+        for page in reader.pages:
+            yield page.extract_text() or "" # Add fallback for empty pages
+        logger.info("Parsed PDF successfully (%d pages).", len(reader.pages))
+    except Exception as e:
+        logger.error("Error parsing PDF file %s: %s", file_storage.filename, e)
+        raise ValueError(f"Could not parse PDF file: {e}") from e
+
+def _limit_chars(segments, max_chars, filename):
+    """Passes segments through until max_chars is reached, then stops the underlying parser."""
+    remaining = max_chars
+    try:
+        for segment in segments:
+            if len(segment) > remaining:
+                logger.warning("Reached the %d character limit while parsing %s; ignoring the rest of the file.", max_chars, filename)
+                if remaining > 0:
+                    yield segment[:remaining]
+                return
+            remaining -= len(segment) + 1 # Count the newline joining segments
+            yield segment
+    finally:
+        segments.close()
 
+def iter_transcript(file_storage, max_chars: int = MAX_PARSE_CHARS):
+    """
+    Yields the text of an uploaded transcript one segment at a time (a line, cue, paragraph
+    or page depending on the format), reading from the upload's own stream.
+    Stops once `max_chars` characters have been produced. Raises ValueError for unsupported
+    or unparseable files.
+    """
+    filename = file_storage.filename
+    logger.debug("Attempting to parse: %s", filename)
+
+    if filename.endswith('.vtt') or filename.endswith('.srt'):
+        segments = _iter_captions(file_storage)
+    elif filename.endswith('.txt'):
+        logger.debug("Parsing TXT as plain text.")
+        segments = _iter_plain_text(file_storage)
+    elif filename.endswith('.docx'):
+        segments = _iter_docx(file_storage)
+    elif filename.endswith('.pdf'):
+        segments = _iter_pdf(file_storage)
     else:
-        print(f"Unsupported file type for parsing: {filename}")
+        logger.warning("Unsupported file type for parsing: %s", filename)
         # Raise an error for unsupported types to be handled in app.py
         raise ValueError(f"Unsupported file type: {filename.split('.')[-1]}")
+
+    return _limit_chars(segments, max_chars, filename)
+
+def _upload_size(file_storage) -> int:
+    stream = file_storage.stream
+    try:
+        position = stream.tell()
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+def parse_transcript(file_storage, max_chars: int = MAX_PARSE_CHARS) -> str:
+    """
+    Parses an uploaded transcript into a single string (see iter_transcript).
+    Timed as the "parse" stage, labelled with the file format.
+    """
+    extension = file_storage.filename.rsplit('.', 1)[-1].lower() if '.' in file_storage.filename else ''
+    file_format = extension if extension in ('txt', 'vtt', 'srt', 'docx', 'pdf') else 'other'
+    with metrics.span("parse", format=file_format) as sizes:
+        sizes["bytes"] = _upload_size(file_storage)
+        transcript_text = "\n".join(iter_transcript(file_storage, max_chars))
+        sizes["chars"] = len(transcript_text)
+    return transcript_text
+
+def parse_upload(file_storage):
+    """
+    Parses a single upload. Returns (filename, transcript_text, skip_reason);
+    exactly one of transcript_text and skip_reason is None.
+    """
+    try:
+        logger.info("Processing file: %s, content-type: %s", file_storage.filename, file_storage.content_type)
+        # parse_transcript handles the different types and raises ValueError on failure/unsupported
+        transcript_text = parse_transcript(file_storage)
+        logger.info("Successfully parsed: %s", file_storage.filename)
+        return file_storage.filename, transcript_text, None
+    except ValueError as e: # Catch specific parsing/type errors
+        logger.warning("Skipping file %s due to parsing error: %s", file_storage.filename, e)
+        return file_storage.filename, None, f"Skipped: {e}"
+    except Exception as e: # Catch other unexpected errors during file processing
+        logger.exception("Unexpected error processing file %s: %s", file_storage.filename, e)
+        return file_storage.filename, None, f"Unexpected Error: {e}"
+
+def parse_upload_bytes(filename, content_type, data):
+    """
+    Process-pool entry point for parse_upload: uploads cannot be pickled, so the worker
+    rebuilds one from bytes. Lives here so parse workers only import the parsers, not the app.
+    """
+    return parse_upload(FileStorage(stream=io.BytesIO(data), filename=filename, content_type=content_type))
@@ -0,0 +1,187 @@
+import functools
+import logging
+import math
+import os
+import re
+import threading
+
+# Token-based prompt budgeting: counts tokens with a local BPE tokenizer (tiktoken, if installed
+# and its encoding is available) or a regex pre-tokenizer estimate, and splits the model's
+# context window between the fixed prompt, the transcript and the reply.
+
+logger = logging.getLogger(__name__)
+
+# Context window of the extraction model (llama3.1-8b on Cerebras: 8192 tokens)
+LLM_CONTEXT_TOKENS = int(os.environ.get("LLM_CONTEXT_TOKENS", 8192))
+# tiktoken encoding used for counting ("none" always uses the regex estimate)
+LLM_TOKENIZER_ENCODING = os.environ.get("LLM_TOKENIZER_ENCODING", "cl100k_base")
+# Expected density of action items (transcript tokens per task) and reply size per task object
+TRANSCRIPT_TOKENS_PER_TASK = int(os.environ.get("LLM_TRANSCRIPT_TOKENS_PER_TASK", 250))
+OUTPUT_TOKENS_PER_TASK = int(os.environ.get("LLM_OUTPUT_TOKENS_PER_TASK", 160))
+MIN_OUTPUT_TOKENS = int(os.environ.get("LLM_MIN_OUTPUT_TOKENS", 512))
+# Chat formatting tokens added per message (role header and separators), and headroom for tokenizer drift
+MESSAGE_OVERHEAD_TOKENS = 4
+SAFETY_MARGIN_TOKENS = int(os.environ.get("LLM_TOKEN_SAFETY_MARGIN", 64))
+# Share of the window kept free instead while counts are regex estimates (tiktoken or its
+# encoding file unavailable), so an undercount cannot push a request past the context length
+ESTIMATE_SAFETY_RATIO = float(os.environ.get("LLM_ESTIMATE_SAFETY_RATIO", 0.15))
+
+# Standard-library approximation of the cl100k pre-tokenizer: contractions, words with an
+# optional leading space, 1-3 digit groups, punctuation runs, newlines and other whitespace
+PRETOKEN_RE = re.compile(r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s*[\r\n]+|\s+(?!\S)|\s+", re.IGNORECASE)
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+def _get_encoder():
+    """Loads the tiktoken encoding once; None if tiktoken or the encoding file is unavailable."""
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    with _encoder_lock:
+        if not _encoder_loaded:
+            if LLM_TOKENIZER_ENCODING.lower() != "none":
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(LLM_TOKENIZER_ENCODING)
+                except Exception as e: # ImportError, or no network to fetch the encoding file
+                    logger.warning("tiktoken encoding %s unavailable (%s); estimating tokens from a regex pre-tokenizer.",
+                                   LLM_TOKENIZER_ENCODING, e)
+            _encoder_loaded = True
+    return _encoder
+
+def tokenizer_name() -> str:
+    return f"tiktoken:{LLM_TOKENIZER_ENCODING}" if _get_encoder() is not None else "regex-estimate"
+
+def _estimate_pretoken(piece: str) -> int:
+    if piece.isspace():
+        return 1
+    word = piece.lstrip(" ")
+    if not word.isascii():
+        # Accented and non-Latin text costs more tokens per character: about one per 3 UTF-8 bytes
+        return max(1, math.ceil(len(word.encode("utf-8")) / 3))
+    if word[0].isalpha():
+        # Common words are one token; longer ones split into pieces of about four letters
+        return 1 + max(0, len(word) - 6) // 4
+    return 1 + (len(word) - 1) // 3 # Digit groups and punctuation runs
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text` under the configured tokenizer (or the regex estimate)."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return sum(_estimate_pretoken(piece) for piece in PRETOKEN_RE.findall(text))
+
+@functools.lru_cache(maxsize=64)
+def cached_token_count(text: str) -> int:
+    """count_tokens for prompt text that repeats on every call (system prompt, templates, rules)."""
+    return count_tokens(text)
+
+class PromptBudget:
+    """
+    Splits a context window between a fixed prompt, transcript text and the reply.
+    The reply is sized from the number of tasks the transcript is expected to contain
+    (TRANSCRIPT_TOKENS_PER_TASK, OUTPUT_TOKENS_PER_TASK), so a full chunk plus its reply
+    fills the window. pack() groups text segments into chunks that fit.
+    """
+
+    def __init__(self, fixed_prompt: str, messages: int = 2, context_tokens: int = LLM_CONTEXT_TOKENS,
+                 transcript_tokens_per_task: int = TRANSCRIPT_TOKENS_PER_TASK,
+                 output_tokens_per_task: int = OUTPUT_TOKENS_PER_TASK,
+                 min_output_tokens: int = MIN_OUTPUT_TOKENS, safety_margin: int = SAFETY_MARGIN_TOKENS):
+        self.fixed_prompt = fixed_prompt
+        self.messages = messages
+        self.context_tokens = context_tokens
+        self.transcript_tokens_per_task = max(1, transcript_tokens_per_task)
+        self.output_tokens_per_task = output_tokens_per_task
+        self.min_output_tokens = min_output_tokens
+        self.safety_margin = safety_margin
+
+    @property
+    def margin(self) -> int:
+        """Headroom left unused in the window: safety_margin, widened while token counts are estimates."""
+        if _get_encoder() is None:
+            return max(self.safety_margin, int(self.context_tokens * ESTIMATE_SAFETY_RATIO))
+        return self.safety_margin
+
+    @property
+    def fixed_tokens(self) -> int:
+        """Tokens of the fixed prompt text and message framing (counted once, then cached)."""
+        return cached_token_count(self.fixed_prompt) + self.messages * MESSAGE_OVERHEAD_TOKENS
+
+    def expected_tasks(self, transcript_tokens: int) -> int:
+        return math.ceil(transcript_tokens / self.transcript_tokens_per_task)
+
+    def output_tokens(self, transcript_tokens: int) -> int:
+        """Reply budget for a transcript of `transcript_tokens`: expected tasks times the size of a task object."""
+        return max(self.min_output_tokens, self.expected_tasks(transcript_tokens) * self.output_tokens_per_task + 16)
+
+    def input_tokens(self, extra_prompt: str = "") -> int:
+        """
+        Largest transcript (in tokens) whose prompt and expected reply fit in the window,
+        given `extra_prompt` text added to the fixed prompt (e.g. user rules).
+        """
+        available = self.context_tokens - self.fixed_tokens - self.margin
+        if extra_prompt:
+            available -= cached_token_count(extra_prompt)
+        # Solve tokens + output_tokens(tokens) <= available for the reply's per-task share
+        ratio = self.output_tokens_per_task / self.transcript_tokens_per_task
+        tokens = int((available - self.output_tokens_per_task - 16) / (1 + ratio))
+        tokens = min(tokens, available - self.min_output_tokens)
+        while tokens > 0 and tokens + self.output_tokens(tokens) > available:
+            tokens -= 1
+        return max(1, tokens)
+
+    def max_tokens(self, prompt_tokens: int, transcript_tokens: int) -> int:
+        """max_tokens for a request whose whole prompt is `prompt_tokens`, capped by the space left in the window."""
+        remaining = self.context_tokens - prompt_tokens - self.margin
+        return max(1, min(self.output_tokens(transcript_tokens), remaining))
+
+    @staticmethod
+    def _split_words(segment: str) -> list:
+        # Words keep their leading whitespace (" word"), the unit BPE pre-tokenizers count as
+        # one piece, so per-word counts add up to the count of the joined text
+        words = re.findall(r"\s*\S+", segment) or [segment]
+        words[-1] += segment[len(segment.rstrip()):] if segment.strip() else ""
+        return words
+
+    def pack(self, segments: list, max_tokens: int, overlap_tokens: int = 0, measure=count_tokens) -> list:
+        """
+        Greedily packs text segments, in order, into chunks of at most `max_tokens`
+        (token counts of concatenated segments are summed, as BPE works within pre-tokens).
+        Each chunk after the first starts with up to `overlap_tokens` of trailing segments
+        from the previous one. Segments larger than a chunk (e.g. a PDF page without speaker
+        labels) are packed word by word, so their chunks fill up and overlap at word level.
+        """
+        pieces = []
+        for segment in segments:
+            segment_tokens = measure(segment)
+            if segment_tokens > max_tokens:
+                pieces.extend((word, measure(word)) for word in self._split_words(segment))
+            elif segment:
+                pieces.append((segment, segment_tokens))
+
+        chunks = []
+        chunk = []
+        chunk_tokens = 0
+        for piece, piece_tokens in pieces:
+            if chunk and chunk_tokens + piece_tokens > max_tokens:
+                chunks.append("".join(text for text, _ in chunk))
+                # Carry trailing pieces forward as overlap, without letting the overlap fill the chunk
+                overlap = []
+                overlap_len = 0
+                for previous in reversed(chunk):
+                    if overlap_len + previous[1] > min(overlap_tokens, max_tokens - piece_tokens):
+                        break
+                    overlap.insert(0, previous)
+                    overlap_len += previous[1]
+                chunk = overlap
+                chunk_tokens = overlap_len
+            chunk.append((piece, piece_tokens))
+            chunk_tokens += piece_tokens
+        if chunk:
+            chunks.append("".join(text for text, _ in chunk))
+        return chunks
@@ -1,6 +1,57 @@
-CREATE TABLE people(
+CREATE TABLE IF NOT EXISTS people(
   id INTEGER PRIMARY KEY,
   full_name TEXT,
   email TEXT UNIQUE,
   alias TEXT
 );
+
+-- One row per extraction (upload or stream); re-analyzing a session replaces its tasks
+CREATE TABLE IF NOT EXISTS meetings(
+  id INTEGER PRIMARY KEY,
+  title TEXT,
+  source_files TEXT, -- JSON list of the uploaded file names
+  session_id TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS tasks(
+  id INTEGER PRIMARY KEY,
+  meeting_id INTEGER NOT NULL REFERENCES meetings(id) ON DELETE CASCADE,
+  item TEXT NOT NULL,
+  assignee TEXT COLLATE NOCASE,
+  assignee_email TEXT,
+  priority TEXT,
+  status TEXT COLLATE NOCASE,
+  due_date TEXT,
+  description TEXT,
+  source_excerpt TEXT,
+  confidence TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_assignee ON tasks(assignee);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_meeting ON tasks(meeting_id);
+
+-- Full-text index over the task text, kept in sync with `tasks` by the triggers below
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+  item, description, source_excerpt, content='tasks', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+  INSERT INTO tasks_fts(rowid, item, description, source_excerpt)
+  VALUES (new.id, new.item, new.description, new.source_excerpt);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+  INSERT INTO tasks_fts(tasks_fts, rowid, item, description, source_excerpt)
+  VALUES ('delete', old.id, old.item, old.description, old.source_excerpt);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE ON tasks BEGIN
+  INSERT INTO tasks_fts(tasks_fts, rowid, item, description, source_excerpt)
+  VALUES ('delete', old.id, old.item, old.description, old.source_excerpt);
+  INSERT INTO tasks_fts(rowid, item, description, source_excerpt)
+  VALUES (new.id, new.item, new.description, new.source_excerpt);
+END;
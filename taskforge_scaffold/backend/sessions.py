@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from llm_agent import (chunk_cache_key, extract_chunk_results, file_block, is_error_result, merge_chunk_results,
+                       pack_files, split_transcript)
+
+logger = logging.getLogger(__name__)
+
+class Session:
+    """
+    Server-side state of one upload, kept so it can be re-analyzed without re-uploading.
+    Holds the parsed text of each file, the extra rules, and the extraction result of every
+    segment (chunk) keyed by its text and rules, so a re-analyze only sends changed segments.
+    """
+
+    def __init__(self, parsed_files: list, skipped_files: list):
+        self.id = uuid.uuid4().hex
+        self.files = OrderedDict(parsed_files) # filename -> transcript text, in upload order
+        self.skipped_files = list(skipped_files)
+        self.rules = None
+        self.title = None
+        self.meeting_id = None # task_store meeting holding this session's latest tasks
+        self.tasks = []
+        self.segment_results = {} # chunk_cache_key(segment, rules) -> task list
+        self.groups = None # Filenames packed into one prompt (llm_agent.pack_files), kept across re-analyzes
+        self.groups_rules = None # Rules the groups were packed for; their prompt space changes the fit
+        self.edited_files = set() # Files edited since the groups were packed
+        self.last_reanalyzed = 0
+        self.lock = threading.Lock()
+        self.updated_at = time.time()
+
+    @property
+    def chars(self) -> int:
+        """Characters of transcript text held, the bulk of a session's memory."""
+        return sum(len(text) for text in self.files.values())
+
+    def edit_files(self, edited_files: dict):
+        """Replaces the text of the given files, remembering which ones actually changed."""
+        for filename, text in edited_files.items():
+            if self.files.get(filename) != text:
+                self.files[filename] = text
+                self.edited_files.add(filename)
+
+    def segments(self) -> list:
+        # Small files are packed together as in /api/upload/stream, so both share extraction_cache
+        # entries. The packing is kept, and an edited file is split out of its group to be chunked
+        # on its own, so one edit changes at most two segments instead of shifting every group.
+        if self.groups is None or self.groups_rules != self.rules:
+            self.groups = pack_files(list(self.files.items()), self.rules)
+            self.groups_rules = self.rules
+            self.edited_files.clear()
+        segments = []
+        for group in self.groups:
+            kept = [filename for filename in group if filename not in self.edited_files]
+            parts = ([kept] if kept else []) + [[filename] for filename in group if filename in self.edited_files]
+            for part in parts:
+                text = "".join(file_block(filename, self.files[filename]) for filename in part)
+                segments.extend(split_transcript(text, rules=self.rules))
+        return segments
+
+    def extract(self) -> list:
+        """
+        Returns the merged raw task list for the current files and rules, calling the LLM only
+        for segments without a stored result. Sets last_reanalyzed to the number of those.
+        """
+        segments = self.segments()
+        keys = [chunk_cache_key(segment, self.rules) for segment in segments]
+        pending = [index for index, key in enumerate(keys) if key not in self.segment_results]
+        self.last_reanalyzed = len(pending)
+        logger.info("Session %s: %d of %d segment(s) need extraction.", self.id, len(pending), len(segments))
+
+        fresh = dict(zip(pending, extract_chunk_results([segments[index] for index in pending], self.rules)))
+        chunk_results = []
+        stored = {}
+        for index, key in enumerate(keys):
+            tasks = fresh[index] if index in fresh else self.segment_results[key]
+            chunk_results.append(tasks)
+            # Failed segments are not stored, so the next re-analyze retries them
+            if not is_error_result(tasks):
+                stored[key] = tasks
+        self.segment_results = stored
+        self.updated_at = time.time()
+        if len(chunk_results) == 1:
+            return chunk_results[0]
+        return merge_chunk_results(chunk_results)
+
+class SessionStore:
+    """
+    In-memory sessions, evicted after `ttl` seconds without use, or least recently used first
+    beyond `max_sessions` or once their transcripts hold more than `max_chars` characters in
+    total. The most recently used session is always kept.
+    """
+
+    def __init__(self, ttl: int = 3600, max_sessions: int = 200, max_chars: int = 50_000_000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, parsed_files: list, skipped_files: list) -> Session:
+        session = Session(parsed_files, skipped_files)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._evict()
+        return session
+
+    def get(self, session_id: str):
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.updated_at = time.time()
+            return session
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def total_chars(self) -> int:
+        with self._lock:
+            return sum(session.chars for session in self._sessions.values())
+
+    def _evict(self):
+        # Caller holds self._lock. Sizes are re-read here since re-analyze edits change them.
+        cutoff = time.time() - self.ttl
+        expired = [session_id for session_id, session in self._sessions.items() if session.updated_at < cutoff]
+        for session_id in expired:
+            del self._sessions[session_id]
+        total_chars = sum(session.chars for session in self._sessions.values())
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or total_chars > self.max_chars):
+            _, session = self._sessions.popitem(last=False)
+            total_chars -= session.chars
+            logger.info("Evicted session %s (%d chars) to stay within the session limits.", session.id, session.chars)
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+MAX_PAGE_SIZE = 200
+
+# Task dict key -> tasks column, in insert order
+TASK_COLUMNS = [
+    ("item", "item"),
+    ("assignee", "assignee"),
+    ("assignee_email", "assignee_email"),
+    ("priority", "priority"),
+    ("status", "status"),
+    ("dueDate", "due_date"),
+    ("description", "description"),
+    ("source_excerpt", "source_excerpt"),
+    ("confidence", "confidence"),
+]
+_INSERT_TASK_SQL = (f"INSERT INTO tasks(meeting_id, {', '.join(column for _, column in TASK_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' for _ in TASK_COLUMNS)})")
+_SELECT_TASK_SQL = ("SELECT tasks.id, tasks.meeting_id, "
+                    + ", ".join(f"tasks.{column}" for _, column in TASK_COLUMNS) + " FROM tasks")
+_SEARCH_TERM_RE = re.compile(r"\w+")
+_ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]*"
+
+def _task_row(meeting_id: int, task: dict) -> tuple:
+    return (meeting_id,) + tuple(None if task.get(key) is None else str(task.get(key)) for key, _ in TASK_COLUMNS)
+
+def _task_dict(row) -> dict:
+    task = {"id": row[0], "meeting_id": row[1]}
+    for (key, _), value in zip(TASK_COLUMNS, row[2:]):
+        task[key] = value
+    return task
+
+def _fts_query(text: str) -> str:
+    # Each word becomes a quoted prefix term, so user input cannot inject FTS5 syntax
+    return " ".join(f'"{term}"*' for term in _SEARCH_TERM_RE.findall(text))
+
+def _page_bounds(page, page_size) -> tuple:
+    page = max(1, int(page or 1))
+    page_size = min(MAX_PAGE_SIZE, max(1, int(page_size or 50)))
+    return page, page_size, (page - 1) * page_size
+
+class TaskStore:
+    """
+    Persistent history of extracted tasks in the SQLite database next to the `people` table.
+    Each extraction is a `meetings` row with its `tasks`, written in a single transaction.
+    Tasks are indexed by assignee, status and due date, with an FTS5 index over
+    item/description/source_excerpt. Each thread gets its own connection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA foreign_keys = ON")
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        conn = self._connection()
+        if not self._schema_ready:
+            self.ensure_schema(conn)
+        return conn
+
+    def ensure_schema(self, conn=None):
+        """Creates any missing tables, indexes and triggers from schema.sql (all IF NOT EXISTS)."""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn = conn or self._connection()
+            with open(SCHEMA_PATH) as f:
+                conn.executescript(f.read())
+            # WAL lets readers run while an extraction is being written
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._schema_ready = True
+
+    def save_meeting(self, tasks: list, title: str = None, source_files: list = None, session_id: str = None) -> int:
+        """Stores a meeting and all its tasks in one transaction. Returns the meeting id."""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO meetings(title, source_files, session_id) VALUES (?, ?, ?)",
+                (title, json.dumps(source_files or []), session_id),
+            )
+            meeting_id = cursor.lastrowid
+            conn.executemany(_INSERT_TASK_SQL, [_task_row(meeting_id, task) for task in tasks])
+        logger.info("Stored %d tasks for meeting %d.", len(tasks), meeting_id)
+        return meeting_id
+
+    def replace_tasks(self, meeting_id: int, tasks: list) -> bool:
+        """Replaces a meeting's tasks (e.g. after a re-analyze) in one transaction. False if the meeting is gone."""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE meetings SET updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now') WHERE id = ?", (meeting_id,)
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute("DELETE FROM tasks WHERE meeting_id = ?", (meeting_id,))
+            conn.executemany(_INSERT_TASK_SQL, [_task_row(meeting_id, task) for task in tasks])
+        logger.info("Replaced the tasks of meeting %d (%d tasks).", meeting_id, len(tasks))
+        return True
+
+    def query_tasks(self, assignee: str = None, status: str = None, open_only: bool = False, due_after: str = None,
+                    due_before: str = None, meeting_id: int = None, search: str = None,
+                    page: int = 1, page_size: int = 50) -> dict:
+        """
+        Returns {"tasks", "total", "page", "page_size"} for tasks across all meetings, newest first
+        (best match first when `search` is given). Assignee and status match case-insensitively;
+        due_after/due_before (YYYY-MM-DD, inclusive) only match ISO due dates.
+        """
+        page, page_size, offset = _page_bounds(page, page_size)
+        joins = ""
+        where = []
+        params = []
+        order = "tasks.id DESC"
+        if search and _fts_query(search):
+            joins = " JOIN tasks_fts ON tasks_fts.rowid = tasks.id"
+            where.append("tasks_fts MATCH ?")
+            params.append(_fts_query(search))
+            order = "bm25(tasks_fts), tasks.id DESC"
+        if assignee:
+            where.append("tasks.assignee = ?")
+            params.append(assignee)
+        if status:
+            where.append("tasks.status = ?")
+            params.append(status)
+        if open_only:
+            where.append("tasks.status != 'Done'")
+        if due_after or due_before:
+            where.append("tasks.due_date GLOB ?")
+            params.append(_ISO_DATE_GLOB)
+        if due_after:
+            where.append("tasks.due_date >= ?")
+            params.append(due_after)
+        if due_before:
+            where.append("tasks.due_date <= ?")
+            params.append(due_before)
+        if meeting_id is not None:
+            where.append("tasks.meeting_id = ?")
+            params.append(meeting_id)
+        where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT count(*) FROM tasks{joins}{where_sql}", params).fetchone()[0]
+        rows = conn.execute(f"{_SELECT_TASK_SQL}{joins}{where_sql} ORDER BY {order} LIMIT ? OFFSET ?",
+                            params + [page_size, offset]).fetchall()
+        return {"tasks": [_task_dict(row) for row in rows], "total": total, "page": page, "page_size": page_size}
+
+    def list_meetings(self, page: int = 1, page_size: int = 50) -> dict:
+        """Returns {"meetings", "total", "page", "page_size"}, newest first, with per-meeting task counts."""
+        page, page_size, offset = _page_bounds(page, page_size)
+        conn = self._connect()
+        total = conn.execute("SELECT count(*) FROM meetings").fetchone()[0]
+        rows = conn.execute(
+            "SELECT meetings.id, title, source_files, session_id, created_at, updated_at,"
+            " (SELECT count(*) FROM tasks WHERE tasks.meeting_id = meetings.id),"
+            " (SELECT count(*) FROM tasks WHERE tasks.meeting_id = meetings.id AND tasks.status != 'Done')"
+            " FROM meetings ORDER BY meetings.id DESC LIMIT ? OFFSET ?",
+            (page_size, offset),
+        ).fetchall()
+        meetings = [{
+            "id": row[0], "title": row[1], "source_files": json.loads(row[2] or "[]"), "session_id": row[3],
+            "created_at": row[4], "updated_at": row[5], "task_count": row[6], "open_task_count": row[7],
+        } for row in rows]
+        return {"meetings": meetings, "total": total, "page": page, "page_size": page_size}
+
+    def get_meeting(self, meeting_id: int):
+        """Returns the meeting dict with its tasks, or None."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, title, source_files, session_id, created_at, updated_at FROM meetings WHERE id = ?",
+            (meeting_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        tasks = conn.execute(f"{_SELECT_TASK_SQL} WHERE tasks.meeting_id = ? ORDER BY tasks.id", (meeting_id,)).fetchall()
+        return {
+            "id": row[0], "title": row[1], "source_files": json.loads(row[2] or "[]"), "session_id": row[3],
+            "created_at": row[4], "updated_at": row[5], "tasks": [_task_dict(task) for task in tasks],
+        }
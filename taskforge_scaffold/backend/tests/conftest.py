@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Backend modules are imported by name (as app.py does), with a deterministic offline setup:
+# the fake LLM, regex token estimates, and databases that never touch the real task store.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["LLM_TOKENIZER_ENCODING"] = "none"
+os.environ["STORE_TASKS"] = "False"
+os.environ["TASKFORGE_DB"] = os.path.join(tempfile.mkdtemp(prefix="taskforge-tests-"), "taskforge.db")
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ.pop("EXTRACTION_CACHE_DB", None)
+
+import llm_agent
+from llm_pool import FakeBackend, LLMClient, TokenBucket, reset_llm_clients, set_llm_client
+
+def install_backend(backend: FakeBackend) -> FakeBackend:
+    """Serves extraction from `backend`, without rate limiting or backoff delays."""
+    set_llm_client("fake", LLMClient(backend, rate_limiter=TokenBucket(0, 1), backoff_base=0))
+    return backend
+
+@pytest.fixture
+def fake_llm():
+    llm_agent.extraction_cache.clear()
+    yield install_backend(FakeBackend())
+    reset_llm_clients()
+    llm_agent.extraction_cache.clear()
+
+def make_task(item: str, assignee: str = "Ann", **fields) -> dict:
+    task = {"item": item, "assignee": assignee, "priority": "Medium", "status": "Todo", "dueDate": "TBD",
+            "description": f"{assignee} will {item.lower()}.", "source_excerpt": f"{assignee}: I will {item.lower()}",
+            "confidence": "High"}
+    task.update(fields)
+    return task
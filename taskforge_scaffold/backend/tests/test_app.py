@@ -0,0 +1,233 @@
+import io
+import json
+import os
+import runpy
+import threading
+import time
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app
+from conftest import BACKEND_DIR, install_backend, make_task
+from llm_pool import FakeBackend
+from task_store import TaskStore
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+def upload(client, url, files):
+    data = {"file": [(io.BytesIO(text.encode("utf-8")), name) for name, text in files]}
+    return client.post(url, data=data, content_type="multipart/form-data")
+
+@pytest.fixture
+def stored(monkeypatch, tmp_path):
+    """Turns task history on, in a throwaway database."""
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    monkeypatch.setattr(app, "STORE_TASKS", True)
+    monkeypatch.setattr(app, "task_store", store)
+    return store
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(app, "PARSE_POOL", "process")
+    monkeypatch.setattr(app, "_parse_process_pool", None)
+    yield
+    if app._parse_process_pool is not None:
+        app._parse_process_pool.shutdown()
+
+def sse_events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def poll_result(client, job_id, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(f"/api/jobs/{job_id}/result")
+        if response.status_code != 202 or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+def test_async_upload_returns_job_then_result(client, fake_llm):
+    release = threading.Event()
+
+    def slow_reply(prompt):
+        release.wait(5)
+        return json.dumps(FakeBackend.tasks_for(prompt))
+
+    install_backend(FakeBackend(responder=slow_reply))
+    response = upload(client, "/api/upload?async=1", [("a.txt", "Ann: I will send the notes\n")])
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status_url"] == f"/api/jobs/{body['job_id']}"
+    assert client.get(f"/api/jobs/{body['job_id']}/result").status_code == 202
+    release.set()
+    result = poll_result(client, body["job_id"])
+    assert result.status_code == 200
+    assert [task["item"] for task in result.get_json()["tasks"]] == ["Send the notes"]
+    assert client.get(body["status_url"]).get_json()["status"] == "done"
+
+def test_failed_job_result_is_a_server_error(client, fake_llm, monkeypatch):
+    def explode(session):
+        raise RuntimeError("worker crashed")
+    monkeypatch.setattr(app, "run_session_extraction", explode)
+    response = client.post("/api/upload", data={"mode": "async", "file": (io.BytesIO(b"Ann: hi\n"), "a.txt")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 202
+    result = poll_result(client, response.get_json()["job_id"])
+    assert result.status_code == 500
+    assert "worker crashed" in result.get_json()["tasks"][0]["description"]
+
+def test_unknown_job_is_not_found(client):
+    assert client.get("/api/jobs/nope").status_code == 404
+    assert client.get("/api/jobs/nope/result").status_code == 404
+
+PARSE_FILES = [("b.txt", "Bob: second\n"), ("a.srt", "1\n00:00:01,000 --> 00:00:02,000\nAnn: first\n"),
+               ("notes.xyz", "not a transcript"), ("c.txt", "Cy: third\n")]
+
+def as_uploads(files):
+    return [FileStorage(stream=io.BytesIO(text.encode("utf-8")), filename=name) for name, text in files]
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_parse_uploaded_files_keeps_upload_order(monkeypatch, workers):
+    monkeypatch.setattr(app, "PARSE_WORKERS", workers)
+    count, skipped, parsed = app.parse_uploaded_files(as_uploads(PARSE_FILES))
+    assert count == 3
+    assert parsed == [("b.txt", "Bob: second"), ("a.srt", "Ann: first"), ("c.txt", "Cy: third")]
+    assert skipped == ["notes.xyz (Skipped: Unsupported file type: xyz)"]
+
+def test_parse_uploaded_files_in_worker_processes(process_pool):
+    count, skipped, parsed = app.parse_uploaded_files(as_uploads(PARSE_FILES))
+    assert (count, skipped) == (3, ["notes.xyz (Skipped: Unsupported file type: xyz)"])
+    assert [name for name, _ in parsed] == ["b.txt", "a.srt", "c.txt"]
+    assert app._parse_process_pool._mp_context.get_start_method() in ("forkserver", "spawn")
+
+def test_stream_upload_sends_tasks_as_events(client, fake_llm):
+    response = upload(client, "/api/upload/stream", [("a.txt", "Ann: I will send the notes\n"), ("b.doc", "oops")])
+    assert response.mimetype == "text/event-stream"
+    events = sse_events(response)
+    assert [kind for kind, _ in events] == ["info", "task", "done"]
+    assert events[1][1]["item"] == "Send the notes"
+    assert events[-1][1] == {"tasks": 1, "invalid": 0, "meeting_id": None}
+
+def test_truncated_stream_upload_reports_an_error(client, fake_llm):
+    install_backend(FakeBackend(responder=lambda prompt: json.dumps(FakeBackend.tasks_for(prompt))[:-40]))
+    response = upload(client, "/api/upload/stream", [("a.txt", "Ann: I will send the notes\nBob: I will book the room\n")])
+    events = sse_events(response)
+    assert [kind for kind, _ in events] == ["task", "error", "done"]
+    assert events[-1][1]["meeting_id"] is None
+
+def test_validate_tasks_reports_original_positions():
+    raw = [make_task("One"), make_task(""), make_task("Three"), dict(make_task("Four"), priority="Urgent")]
+    validated, errors = app.validate_tasks(raw)
+    assert [task["item"] for task in validated] == ["One", "Three"]
+    assert [error.split(":")[0] for error in errors] == ["Task 2", "Task 4"]
+    assert "'item'" in errors[0] and "'priority'" in errors[1]
+
+def test_upload_reports_invalid_and_duplicate_tasks(client, fake_llm):
+    tasks = [make_task("Send the notes"), make_task("send the notes!"), make_task("Book a room", assignee="")]
+    install_backend(FakeBackend(responder=lambda prompt: json.dumps(tasks)))
+    body = upload(client, "/api/upload", [("a.txt", "Ann: I will send the notes\n")]).get_json()
+    assert [task["item"] for task in body["tasks"]] == ["Validation Errors", "Send the notes"]
+    assert body["tasks"][0]["description"].count("Task 3:") == 1
+
+def test_export_streams_the_board(client):
+    openpyxl = pytest.importorskip("openpyxl")
+    tasks = [make_task("Send the notes", "Ann"), make_task("=1+1", "Bob"),
+             {"item": "Partial Extraction", "assignee": "System", "status": "Error"}]
+    response = client.post("/api/export", json={"tasks": tasks})
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == "attachment; filename=tasks_board.xlsx"
+    workbook = openpyxl.load_workbook(io.BytesIO(response.data))
+    assert workbook.sheetnames == ["Ann", "Bob"] # System entries are not exported
+    assert workbook["Bob"]["A2"].data_type == "s"
+
+def test_export_requires_a_task_list(client):
+    assert client.post("/api/export", json={"tasks": "nope"}).status_code == 400
+    assert client.post("/api/export", data="not json").status_code == 400
+
+def test_reanalyze_resends_only_edited_file(client, fake_llm):
+    backend = install_backend(FakeBackend())
+    body = upload(client, "/api/upload", [("a.txt", "Ann: I will send the notes\n"), ("b.txt", "Bob: I will book the room\n")]).get_json()
+    assert backend.calls == 1
+    response = client.post(f"/api/sessions/{body['session_id']}/reanalyze",
+                           json={"files": {"b.txt": "Bob: I will book the hall\n"}})
+    assert response.status_code == 200
+    assert response.get_json()["reanalyzed_segments"] == 2
+    assert sorted(task["item"] for task in response.get_json()["tasks"]) == ["Book the hall", "Send the notes"]
+    assert client.get(f"/api/sessions/{body['session_id']}").get_json()["files"] == ["a.txt", "b.txt"]
+
+def test_reanalyze_rejects_bad_requests(client, fake_llm):
+    session_id = upload(client, "/api/upload", [("a.txt", "Ann: I will send the notes\n")]).get_json()["session_id"]
+    assert client.post(f"/api/sessions/{session_id}/reanalyze", json={"files": {"z.txt": "x"}}).status_code == 400
+    assert client.post(f"/api/sessions/{session_id}/reanalyze", json={"rules": 3}).status_code == 400
+    assert client.post("/api/sessions/nope/reanalyze", json={}).status_code == 404
+
+def test_metrics_endpoint(client, fake_llm):
+    upload(client, "/api/upload", [("a.txt", "Ann: I will send the notes\n")])
+    response = client.get("/api/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'taskforge_stage_duration_seconds_count{format="txt",stage="parse"}' in text
+    assert 'taskforge_stage_duration_seconds_count{mode="sync",stage="llm_round_trip"}' in text
+    assert "taskforge_extraction_cache_misses_total" in text
+    assert "taskforge_jobs_queued" in text and "taskforge_session_chars" in text
+
+def test_create_app_warms_up(client, fake_llm):
+    assert app.create_app() is app.app
+    assert 'taskforge_startup_seconds{phase="warm"}' in client.get("/api/metrics").get_data(as_text=True)
+
+def test_gunicorn_config_defaults(monkeypatch):
+    for name in ("WEB_CONCURRENCY", "GUNICORN_THREADS", "GUNICORN_TIMEOUT", "FLASK_RUN_PORT"):
+        monkeypatch.delenv(name, raising=False)
+    config = runpy.run_path(os.path.join(BACKEND_DIR, "gunicorn.conf.py"))
+    assert config["wsgi_app"] == "app:create_app()" and config["preload_app"]
+    assert (config["workers"], config["threads"], config["timeout"]) == (1, 8, 120)
+
+def test_upload_extracts_and_stores(client, fake_llm, stored):
+    response = upload(client, "/api/upload", [("a.txt", "Ann: I will send the notes\n")])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [task["item"] for task in body["tasks"]] == ["Send the notes"]
+    assert stored.query_tasks(meeting_id=body["meeting_id"])["total"] == 1
+    assert client.get("/api/tasks?q=notes").get_json()["total"] == 1
+    assert client.get(f"/api/meetings/{body['meeting_id']}").get_json()["source_files"] == ["a.txt"]
+
+def test_partial_failure_is_reported_and_not_stored(client, fake_llm, stored):
+    # Two files too large to share a prompt; the second one's chunk keeps failing
+    lines = "".join(f"Ann: I will check report {n} with the finance team today\n" for n in range(300))
+    files = [("a.txt", lines), ("b.txt", lines.replace("Ann", "Bob"))]
+    install_backend(FakeBackend(responder=lambda prompt: "oops" if "Bob:" in prompt else json.dumps(FakeBackend.tasks_for(prompt))))
+    body = upload(client, "/api/upload", files).get_json()
+    assert body["tasks"][0]["item"] == "Partial Extraction"
+    assert any(task["assignee"] == "Ann" for task in body["tasks"])
+    assert body["meeting_id"] is None
+    assert stored.query_tasks()["total"] == 0
+
+def test_failed_reanalyze_keeps_the_session_meeting(client, fake_llm, stored):
+    backend = install_backend(FakeBackend())
+    body = upload(client, "/api/upload", [("a.txt", "Ann: I will send the notes\n")]).get_json()
+    meeting_id = body["meeting_id"]
+    reanalyze = f"/api/sessions/{body['session_id']}/reanalyze"
+
+    backend.responder = lambda prompt: "no JSON here"
+    failed = client.post(reanalyze, json={"files": {"a.txt": "Ann: I will send the deck\n"}}).get_json()
+    assert failed["meeting_id"] is None
+
+    backend.responder = None
+    retried = client.post(reanalyze, json={}).get_json()
+    assert retried["meeting_id"] == meeting_id
+    assert stored.list_meetings()["total"] == 1
+    assert [task["item"] for task in stored.query_tasks(meeting_id=meeting_id)["tasks"]] == ["Send the deck"]
+
+def test_truncated_stream_is_not_stored(client, fake_llm, stored):
+    install_backend(FakeBackend(responder=lambda prompt: json.dumps(FakeBackend.tasks_for(prompt))[:-40]))
+    upload(client, "/api/upload/stream", [("a.txt", "Ann: I will send the notes\nBob: I will book the room\n")])
+    assert stored.list_meetings()["total"] == 0
+    install_backend(FakeBackend())
+    events = sse_events(upload(client, "/api/upload/stream", [("a.txt", "Ann: I will send the notes\n")]))
+    assert stored.query_tasks(meeting_id=events[-1][1]["meeting_id"])["total"] == 1
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from assignees import AssigneeResolver, normalize_label
+
+@pytest.fixture
+def people_db(tmp_path):
+    path = str(tmp_path / "people.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE people(id INTEGER PRIMARY KEY, full_name TEXT, email TEXT UNIQUE, alias TEXT)")
+    conn.executemany("INSERT INTO people(full_name, email, alias) VALUES (?, ?, ?)", [
+        ("Alice Johnson", "alice.johnson@example.com", "AJ"),
+        ("Bob Smith", "bob@example.com", "Bobby"),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+def resolver_for(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    resolver = AssigneeResolver(path, refresh_interval=0)
+    resolver.refresh(force=True)
+    return resolver
+
+def test_resolves_aliases_first_names_and_typos(people_db):
+    resolver = resolver_for(people_db)
+    assert resolver.resolve("AJ")["full_name"] == "Alice Johnson"
+    assert resolver.resolve("[PM] alice")["full_name"] == "Alice Johnson"
+    assert resolver.resolve("Alice Jonson")["full_name"] == "Alice Johnson"
+    assert resolver.resolve("Unassigned") is None
+    assert normalize_label("Alice (Acme)") == "alice"
+
+def test_refresh_picks_up_same_length_edits(people_db):
+    resolver = resolver_for(people_db)
+    # Same lengths as the old values, so only a content comparison notices
+    people_db.execute("UPDATE people SET full_name = 'Robert Smi', alias = 'Robby' WHERE email = 'bob@example.com'")
+    people_db.commit()
+    assert resolver.refresh()
+    assert resolver.resolve("Robby")["full_name"] == "Robert Smi"
+    assert resolver.resolve("Bobby") is None
+
+def test_refresh_appends_new_rows(people_db):
+    resolver = resolver_for(people_db)
+    people_db.execute("INSERT INTO people(full_name, email, alias) VALUES ('Carol King', 'carol@example.com', '')")
+    people_db.commit()
+    assert resolver.refresh()
+    assert resolver.resolve("carol")["email"] == "carol@example.com"
+    assert not resolver.refresh()
+
+def test_resolve_tasks_adds_email(people_db):
+    resolver = resolver_for(people_db)
+    tasks = resolver.resolve_tasks([{"item": "a", "assignee": "bobby"}, {"item": "b", "assignee": "Zed"}])
+    assert tasks == [{"item": "a", "assignee": "Bob Smith", "assignee_email": "bob@example.com"},
+                     {"item": "b", "assignee": "Zed"}]
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+def run_benchmark(*args):
+    return subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "benchmark.py"), "--turns", "40", "--iterations", "2",
+                           "--llm-latency", "0", *args], capture_output=True, text=True, cwd=BACKEND_DIR, timeout=120)
+
+def test_benchmark_reports_every_stage_and_checks_baselines(tmp_path):
+    baseline = str(tmp_path / "bench.json")
+    result = run_benchmark("--stages", "parse,extract,upload,export", "--formats", "txt,srt,docx,pdf",
+                           "--json", "--save-baseline", baseline)
+    assert result.returncode == 0, result.stderr
+    stages = [row["stage"] for row in json.loads(result.stdout)]
+    assert stages == ["parse:txt", "parse:srt", "parse:docx", "parse:pdf", "extract", "upload", "export"]
+
+    with open(baseline) as f:
+        saved = json.load(f)
+    for row in saved:
+        row["p90_ms"] = row["peak_rss_mb"] = 1e-6 # Anything measured now is a regression
+    with open(baseline, "w") as f:
+        json.dump(saved, f)
+    result = run_benchmark("--stages", "parse", "--formats", "txt", "--baseline", baseline)
+    assert result.returncode == 1
+    assert "parse:txt: p90_ms" in result.stderr
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+def test_stage_peak_rss_is_per_stage():
+    import benchmark
+    with benchmark.StagePeakRSS() as large:
+        block = bytearray(200 * 1024 * 1024)
+        block[::4096] = b"x" * len(block[::4096]) # Touch every page
+        del block
+    with benchmark.StagePeakRSS() as small:
+        sum(range(1000))
+    assert not large.cumulative
+    assert large.peak - small.peak > 150
+    assert benchmark.percentile([3, 1, 2, 4], 0.5) == 2
@@ -0,0 +1,53 @@
+import io
+import time
+
+import pytest
+
+from conftest import make_task
+from excel_builder import build_workbook
+
+openpyxl = pytest.importorskip("openpyxl")
+
+def load(tasks):
+    return openpyxl.load_workbook(build_workbook(tasks, output=io.BytesIO()))
+
+def test_one_styled_sheet_per_owner():
+    workbook = load([make_task("Send the notes", "Ann", priority="High", status="Done"),
+                     make_task("Book a room", "Bob"), make_task("Draft memo", None)])
+    assert workbook.sheetnames == ["Ann", "Bob", "Unassigned"]
+    sheet = workbook["Ann"]
+    assert [cell.value for cell in sheet[1]] == ["Item", "Assignee", "Priority", "Status", "Due Date",
+                                                "Description", "Confidence", "Source Excerpt"]
+    assert sheet["A1"].style == "tf_header" and sheet["A1"].font.b
+    assert sheet["C2"].style == "tf_priority_High" and sheet["C2"].fill.fgColor.rgb == "FFB31337"
+    assert sheet["D2"].style == "tf_status_Done"
+    assert sheet.freeze_panes == "A2"
+    assert sheet.column_dimensions["A"].width == 45
+    assert [str(validation.sqref) for validation in sheet.data_validations.dataValidation] == ["C2", "D2"]
+    assert workbook["Bob"]["C2"].style == "tf_priority_Medium"
+    assert workbook["Bob"]["D2"].style == "Normal" # "Todo" has no colour
+
+def test_text_that_looks_like_a_formula_stays_text():
+    workbook = load([make_task('=HYPERLINK("http://evil","x")', "Ann", description="+cmd|' /C calc'!A0")])
+    cell = workbook["Ann"]["A2"]
+    assert cell.data_type == "s" and cell.value == '=HYPERLINK("http://evil","x")'
+    assert cell.quotePrefix
+    assert workbook["Ann"]["F2"].data_type == "s"
+
+def test_unusual_values_and_sheet_titles():
+    workbook = load([make_task("a\x01b <&>", "Ops/Team: [EU]", dueDate=None, confidence=3),
+                     make_task("c", "ops_team_ _eu_")])
+    assert workbook.sheetnames == ["Ops_Team_ _EU_", "ops_team_ _eu_ (2)"]
+    row = [cell.value for cell in workbook.worksheets[0][2]]
+    assert row[0] == "ab <&>" and row[4] is None and row[6] == 3
+
+def test_empty_board_has_a_sheet():
+    assert load([]).sheetnames == ["Unassigned"]
+
+def test_large_board_exports_in_seconds():
+    tasks = [make_task(f"Task number {n}", f"Person {n % 12}", priority=("High", "Medium", "Low")[n % 3])
+             for n in range(50000)]
+    started = time.perf_counter()
+    output = build_workbook(tasks, output=io.BytesIO())
+    assert time.perf_counter() - started < 10
+    assert sum(sheet.max_row - 1 for sheet in openpyxl.load_workbook(output, read_only=True).worksheets) == 50000
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+
+import pytest
+
+import extraction_cache
+from extraction_cache import ExtractionCache, make_cache_key
+
+TASKS = [{"item": "Send the notes", "assignee": "Ann"}]
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(extraction_cache.time, "time", clock)
+    return clock
+
+def test_key_ignores_whitespace_but_not_model_or_prompt():
+    key = make_cache_key("Ann: hi\r\n\r\nBob:  ok", "m", "prompt")
+    assert key == make_cache_key("Ann: hi Bob: ok ", "m", "prompt")
+    assert key != make_cache_key("Ann: hi Bob: ok", "other", "prompt")
+    assert key != make_cache_key("Ann: hi Bob: ok", "m", "prompt v2")
+
+def test_memory_lru_returns_copies():
+    cache = ExtractionCache(max_entries=2)
+    cache.put("a", TASKS)
+    cache.get("a")[0]["item"] = "changed by a caller"
+    assert cache.get("a") == TASKS
+    cache.put("b", TASKS)
+    cache.put("c", TASKS) # Evicts "a", the least recently used
+    assert cache.get("a") is None
+    assert cache.stats()["memory_entries"] == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_entries_expire_after_ttl(clock):
+    cache = ExtractionCache(ttl_seconds=60)
+    cache.put("a", TASKS)
+    clock.now += 60
+    assert cache.get("a") == TASKS
+    clock.now += 1
+    assert cache.get("a") is None
+
+def test_sqlite_layer_survives_restart_and_evicts_expired_rows(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = ExtractionCache(ttl_seconds=60, db_path=path)
+    cache.put("old", TASKS)
+    clock.now += 30
+    cache.put("new", TASKS)
+
+    restarted = ExtractionCache(ttl_seconds=60, db_path=path)
+    assert restarted.stats()["persistent"]
+    assert restarted.get("new") == TASKS
+    clock.now += 31
+    assert restarted.get("old") is None # Expired rows are misses
+    restarted.put("newest", TASKS) # Writes delete expired rows
+    keys = {row[0] for row in sqlite3.connect(path).execute("SELECT key FROM extraction_cache")}
+    assert keys == {"new", "newest"}
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_sqlite_connection_is_reopened_after_fork(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ExtractionCache(db_path=path)
+    parent_connection = cache._db
+    pid = os.fork()
+    if pid == 0:
+        ok = cache._db is not parent_connection
+        cache._memory.clear()
+        cache.put("from_child", TASKS)
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert cache.get("from_child") == TASKS # Written by the child through its own connection
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobQueue
+
+def wait_for(job, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not job.is_finished():
+        assert time.monotonic() < deadline, f"job still {job.status}"
+        time.sleep(0.005)
+    return job
+
+@pytest.fixture
+def job_queue():
+    queue = JobQueue(max_workers=1, result_ttl=60)
+    yield queue
+    queue.shutdown()
+
+def test_job_result_and_states(job_queue):
+    release = threading.Event()
+    first = job_queue.submit(release.wait, 5)
+    second = job_queue.submit(lambda a, b=0: a + b, 2, b=3)
+    assert first.status in (JOB_QUEUED, JOB_RUNNING)
+    assert second.status == JOB_QUEUED # One worker, busy with the first job
+    assert job_queue.counts()[JOB_QUEUED] == 1
+    release.set()
+    assert wait_for(second).result == 5
+    assert second.status == JOB_DONE
+    assert second.started_at <= second.finished_at
+    assert job_queue.get(second.id) is second
+
+def test_failed_job_keeps_the_error(job_queue):
+    def fail():
+        raise RuntimeError("parser exploded")
+    job = wait_for(job_queue.submit(fail))
+    assert job.status == JOB_FAILED
+    assert job.to_dict()["error"] == "parser exploded"
+    assert job.result is None
+
+def test_finished_jobs_expire():
+    queue = JobQueue(max_workers=1, result_ttl=0)
+    try:
+        job = wait_for(queue.submit(lambda: 1))
+        time.sleep(0.01)
+        assert queue.get(job.id) is None
+        assert queue.get("unknown") is None
+    finally:
+        queue.shutdown()
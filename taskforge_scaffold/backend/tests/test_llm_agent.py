@@ -0,0 +1,103 @@
+import llm_agent
+import prompt_budget
+from conftest import install_backend, make_task
+from llm_pool import FakeBackend
+
+def commitments(count: int, start: int = 0) -> str:
+    return "".join(f"Speaker{n % 3}: I will finish work package number {n}\n" for n in range(start, start + count))
+
+def test_long_transcript_is_extracted_in_overlapping_chunks(fake_llm):
+    backend = install_backend(FakeBackend())
+    text = commitments(600)
+    chunks = llm_agent.split_transcript(text)
+    assert len(chunks) > 1
+    tasks = llm_agent.extract_tasks_from_transcript(text)
+    assert backend.calls == len(chunks)
+    # Tasks repeated by the overlap are merged away
+    assert [task["item"] for task in tasks] == [f"Finish work package number {n}" for n in range(600)]
+
+def test_partial_chunk_failure_is_reported():
+    ok = [make_task("Send the notes")]
+    error = [{"item": "API Call Error", "description": "boom", "status": "Error", "assignee": "System"}]
+    merged = llm_agent.merge_chunk_results([ok, error, ok])
+    assert merged[0]["item"] == "Partial Extraction"
+    assert "1 of 3" in merged[0]["description"] and "chunk 2: boom" in merged[0]["description"]
+    assert merged[1:] == ok
+    assert llm_agent.merge_chunk_results([error, error]) == error
+
+def test_repeated_extraction_is_served_from_cache(fake_llm):
+    backend = install_backend(FakeBackend())
+    tasks = llm_agent.extract_tasks_from_transcript(commitments(3))
+    assert llm_agent.extract_tasks_from_transcript(commitments(3).replace("\n", "\r\n\n")) == tasks
+    assert backend.calls == 1
+    llm_agent.extract_tasks_from_transcript(commitments(3), rules="Only Speaker0")
+    assert backend.calls == 2
+
+def test_extraction_retries_through_the_shared_client(fake_llm):
+    backend = install_backend(FakeBackend(failures=[429, 503]))
+    tasks = llm_agent.extract_tasks_from_transcript(commitments(3))
+    assert [task["item"] for task in tasks] == [f"Finish work package number {n}" for n in range(3)]
+    assert backend.calls == 3
+
+def test_exhausted_retries_become_an_error_task(fake_llm):
+    install_backend(FakeBackend(failures=[503] * 10))
+    tasks = llm_agent.extract_tasks_from_transcript(commitments(3))
+    assert llm_agent.is_error_result(tasks)
+    assert tasks[0]["item"] == "API Call Error"
+
+def test_stream_yields_tasks_and_caches_complete_replies(fake_llm):
+    backend = install_backend(FakeBackend())
+    events = list(llm_agent.stream_tasks_from_transcript(commitments(3)))
+    assert [kind for kind, _ in events] == ["task"] * 3
+    assert list(llm_agent.stream_tasks_from_transcript(commitments(3))) == events
+    assert backend.calls == 1
+
+def test_truncated_stream_is_reported_and_not_cached(fake_llm):
+    backend = install_backend(FakeBackend(responder=lambda prompt: '[{"item": "a", "assignee": "Ann"}, {"item": "b'))
+    events = list(llm_agent.stream_tasks_from_transcript(commitments(2)))
+    assert [kind for kind, _ in events] == ["task", "error"]
+    assert "cut off after 1 task" in events[1][1]["description"]
+    assert llm_agent.extraction_cache.stats()["memory_entries"] == 0
+    backend.responder = None
+    llm_agent.extract_tasks_from_transcript(commitments(2))
+    assert backend.calls == 2
+
+def test_preamble_only_stream_is_an_error(fake_llm):
+    install_backend(FakeBackend(responder=lambda prompt: "I found [2] tasks but cannot list them."))
+    events = list(llm_agent.stream_tasks_from_transcript(commitments(2)))
+    assert [kind for kind, _ in events] == ["error"]
+
+def test_small_files_are_packed_into_one_chunk():
+    files = [(f"f{n}.txt", commitments(1, n)) for n in range(20)]
+    assert llm_agent.pack_files(files) == [[name for name, _ in files]]
+    chunks = llm_agent.split_files(files)
+    assert len(chunks) == 1
+    assert chunks[0] == "".join(llm_agent.file_block(name, text) for name, text in files)
+
+def test_large_file_gets_its_own_group():
+    files = [("a.txt", commitments(1)), ("big.txt", commitments(600)), ("b.txt", commitments(1, 1))]
+    assert llm_agent.pack_files(files) == [["a.txt"], ["big.txt"], ["b.txt"]]
+    assert len(llm_agent.split_files(files)) > 3
+
+def test_oversized_text_splits_within_budget_with_overlap():
+    budget = llm_agent.prompt_budget.input_tokens()
+    # One paragraph without speaker lines, larger than several prompts
+    text = " ".join(f"word{n} and some more filler text here." for n in range(8000))
+    chunks = llm_agent.split_transcript(text)
+    assert len(chunks) > 1
+    assert all(prompt_budget.count_tokens(chunk) <= budget for chunk in chunks)
+    assert all(prompt_budget.count_tokens(chunk) > budget * 0.8 for chunk in chunks[:-1])
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.lstrip()[:40] in previous[len(previous) // 2:] # Starts inside the previous chunk's tail
+
+def test_estimates_keep_a_proportional_margin():
+    assert prompt_budget.tokenizer_name() == "regex-estimate"
+    budget = prompt_budget.PromptBudget("", context_tokens=8192)
+    assert budget.margin == int(8192 * prompt_budget.ESTIMATE_SAFETY_RATIO)
+    assert budget.input_tokens() < 8192 - budget.margin - budget.min_output_tokens
+
+def test_reply_budget_grows_with_the_chunk():
+    small, _ = llm_agent._reply_budget(commitments(2))
+    large, prompt_tokens = llm_agent._reply_budget(commitments(150))
+    assert small == prompt_budget.MIN_OUTPUT_TOKENS
+    assert small < large <= prompt_budget.LLM_CONTEXT_TOKENS - prompt_tokens
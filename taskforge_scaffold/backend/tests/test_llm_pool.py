@@ -0,0 +1,98 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_pool
+from llm_pool import FakeBackend, FakeHTTPError, LLMClient, LLMTimeoutError, TokenBucket
+
+MESSAGES = [{"role": "user", "content": "Ann: I will send the notes"}]
+
+def make_client(backend, **kwargs):
+    kwargs.setdefault("rate_limiter", TokenBucket(0, 1))
+    kwargs.setdefault("backoff_base", 0)
+    return LLMClient(backend, **kwargs)
+
+class RetryAfterError(Exception):
+    def __init__(self, seconds):
+        super().__init__("rate limited")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(seconds)})
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert 0.02 <= time.monotonic() - started < 0.5
+
+def test_token_bucket_disabled_with_zero_rate():
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert all(bucket.acquire(timeout=0) for _ in range(100))
+
+def test_retries_retryable_failures(fake_llm):
+    backend = FakeBackend(failures=[429, 503])
+    reply = make_client(backend).chat(MESSAGES, model="m")
+    assert backend.calls == 3
+    assert '"assignee": "Ann"' in reply
+
+def test_does_not_retry_client_errors():
+    backend = FakeBackend(failures=[400])
+    with pytest.raises(FakeHTTPError):
+        make_client(backend).chat(MESSAGES, model="m")
+    assert backend.calls == 1
+
+def test_gives_up_after_max_retries():
+    backend = FakeBackend(failures=[503] * 5)
+    with pytest.raises(FakeHTTPError):
+        make_client(backend, max_retries=2).chat(MESSAGES, model="m")
+    assert backend.calls == 3
+
+def test_honours_retry_after(monkeypatch):
+    delays = []
+    monkeypatch.setattr(llm_pool.time, "sleep", delays.append)
+    errors = [RetryAfterError(0.25)]
+
+    class Backend(FakeBackend):
+        def chat(self, *args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return "[]"
+
+    assert make_client(Backend()).chat(MESSAGES, model="m") == "[]"
+    assert delays == [0.25]
+
+def test_retry_that_would_overrun_the_budget_is_not_attempted():
+    errors = [RetryAfterError(5)]
+
+    class Backend(FakeBackend):
+        def chat(self, *args, **kwargs):
+            self.calls += 1
+            if errors:
+                raise errors.pop()
+            return "[]"
+
+    backend = Backend()
+    with pytest.raises(RetryAfterError):
+        make_client(backend, timeout=0.5).chat(MESSAGES, model="m")
+    assert backend.calls == 1
+
+def test_rate_limit_wait_counts_against_the_budget():
+    client = make_client(FakeBackend(), rate_limiter=TokenBucket(rate=0.01, capacity=1), timeout=0.05)
+    client.chat(MESSAGES, model="m")
+    with pytest.raises(LLMTimeoutError):
+        client.chat(MESSAGES, model="m")
+
+def test_stream_retries_before_the_first_piece():
+    backend = FakeBackend(failures=[503])
+    pieces = list(make_client(backend).chat_stream(MESSAGES, model="m"))
+    assert backend.calls == 2
+    assert "".join(pieces).startswith('[{"item": "Send the notes"')
+
+def test_is_retryable():
+    assert llm_pool.is_retryable(FakeHTTPError(429))
+    assert llm_pool.is_retryable(ConnectionError())
+    assert not llm_pool.is_retryable(FakeHTTPError(401))
+    assert not llm_pool.is_retryable(ValueError())
@@ -0,0 +1,53 @@
+import pytest
+
+import metrics
+
+def series(histogram, **labels):
+    return histogram.snapshot().get(metrics._label_key(labels))
+
+def test_span_records_duration_and_sizes():
+    with metrics.span("test_parse", format="txt") as sizes:
+        sizes["chars"] = 120
+        sizes["tasks"] = 0 # Zero sizes add nothing
+    counts, total, count = series(metrics.STAGE_SECONDS, stage="test_parse", format="txt")
+    assert count == 1 and sum(counts) == 1 and total >= 0
+    text = metrics.render_prometheus()
+    assert 'taskforge_stage_chars_total{format="txt",stage="test_parse"} 120' in text
+    assert 'taskforge_stage_tasks_total{format="txt",stage="test_parse"}' not in text
+
+def test_span_counts_errors_and_reraises():
+    with pytest.raises(ValueError):
+        with metrics.span("test_fail"):
+            raise ValueError("boom")
+    assert series(metrics.STAGE_SECONDS, stage="test_fail")[2] == 1
+    assert 'taskforge_stage_errors_total{stage="test_fail"} 1' in metrics.render_prometheus()
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test.", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value, stage='a"b')
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="a\\"b",le="0.1"} 2',
+        'test_seconds_bucket{stage="a\\"b",le="1.0"} 3',
+        'test_seconds_bucket{stage="a\\"b",le="+Inf"} 4',
+        'test_seconds_sum{stage="a\\"b"} 5.65',
+        'test_seconds_count{stage="a\\"b"} 4',
+    ]
+
+def test_render_prometheus_with_extra_gauges():
+    text = metrics.render_prometheus({"test_queue": ("Queued.", 3), "test_hits_total": ("Hits.", 7, "counter")})
+    assert "# TYPE test_queue gauge\ntest_queue 3.0" in text
+    assert "# TYPE test_hits_total counter\ntest_hits_total 7.0" in text
+    assert text.endswith("\n")
+
+def test_record_llm_usage():
+    class Usage:
+        prompt_tokens = 11
+        completion_tokens = 0
+    metrics.record_llm_usage("test_provider", Usage())
+    metrics.record_llm_usage("test_provider", None)
+    text = metrics.render_prometheus()
+    assert 'taskforge_llm_tokens_total{kind="prompt",provider="test_provider"} 11' in text
+    assert 'kind="completion",provider="test_provider"' not in text
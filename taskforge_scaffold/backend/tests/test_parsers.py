@@ -0,0 +1,79 @@
+import io
+import logging
+
+from werkzeug.datastructures import FileStorage
+
+import parsers
+
+def upload(name: str, text: str) -> FileStorage:
+    return FileStorage(stream=io.BytesIO(text.encode("utf-8")), filename=name)
+
+def srt(*cues) -> str:
+    return "".join(f"{n}\n00:00:{n % 60:02d},000 --> 00:00:{n % 60:02d},900\n{text}\n\n" for n, text in enumerate(cues, 1))
+
+def test_iter_transcript_streams_segments():
+    segments = parsers.iter_transcript(upload("a.txt", "one\ntwo\nthree\n"))
+    assert next(segments) == "one"
+    assert list(segments) == ["two", "three"]
+
+def test_exact_fill_does_not_warn(caplog):
+    with caplog.at_level(logging.WARNING, logger="parsers"):
+        text = parsers.parse_transcript(upload("a.txt", "abcd\nefgh\n"), max_chars=9)
+    assert text == "abcd\nefgh"
+    assert not caplog.records
+
+def test_limit_truncates_and_warns(caplog):
+    with caplog.at_level(logging.WARNING, logger="parsers"):
+        text = parsers.parse_transcript(upload("a.txt", "abcd\nefgh\n"), max_chars=7)
+    assert text == "abcd\nef"
+    assert "character limit" in caplog.text
+
+def test_limit_stops_caption_parsing_early():
+    stream = io.BytesIO(srt(*[f"Speaker{n % 2}: line {n}" for n in range(20000)]).encode("utf-8"))
+    text = parsers.parse_transcript(FileStorage(stream=stream, filename="a.srt"), max_chars=5000)
+    assert len(text) == 5000
+    assert stream.tell() < len(stream.getvalue()) // 10
+
+def test_unsupported_file_type():
+    filename, text, skip_reason = parsers.parse_upload(upload("a.xyz", "text"))
+    assert (filename, text) == ("a.xyz", None)
+    assert skip_reason == "Skipped: Unsupported file type: xyz"
+
+def test_srt_with_byte_order_mark():
+    assert parsers.parse_transcript(upload("a.srt", "﻿" + srt("Ann: Hello", "Bob: Hi"))) == "Ann: Hello\nBob: Hi"
+
+def test_unlabelled_cues_are_not_merged():
+    text = parsers.parse_transcript(upload("a.srt", srt("first line", "second line", "Ann: one", "Ann: two")))
+    assert text.splitlines() == ["first line", "second line", "Ann: one two"]
+
+def test_speaker_turns_are_capped():
+    cue = "Ann: " + "word " * 100
+    lines = parsers.parse_transcript(upload("a.srt", srt(*[cue] * 50))).splitlines()
+    assert len(lines) > 1
+    assert all(len(line) <= parsers.MAX_TURN_CHARS + len("Ann: ") for line in lines)
+
+def test_srt_cue_with_two_speakers_keeps_both():
+    text = parsers.parse_transcript(upload("a.srt", srt("- Ann: Are you coming?\n- Bob: Yes I will send it.",
+                                                         "- Are you sure?\n- Yes.", "Ann: a long line that\nwraps")))
+    assert text.splitlines() == ["Ann: Are you coming?", "Bob: Yes I will send it.", "- Are you sure?", "- Yes.",
+                                 "Ann: a long line that wraps"]
+
+def test_vtt_cue_with_two_speakers_keeps_both():
+    vtt = ("WEBVTT\n\n00:00:01.000 --> 00:00:04.000\n<v Ann>Can you send the deck?</v>\n<v Bob>Sure, I will.</v>\n\n"
+           "00:00:05.000 --> 00:00:06.000\n<v Bob>Tonight,\nafter the call.</v>\n")
+    assert parsers.parse_transcript(upload("a.vtt", vtt)).splitlines() == [
+        "Ann: Can you send the deck?", "Bob: Sure, I will. Tonight, after the call."]
+
+def test_timestamps_are_optional():
+    cues = list(parsers.iter_cues(upload("a.srt", "1\n01:02:03,500 --> 01:02:05,000\nAnn: Hi\n")))
+    assert (cues[0].start, cues[0].end, cues[0].speaker) == (3723.5, 3725.0, "Ann")
+    assert parsers.format_cue(cues[0], with_timestamp=True) == "[01:02:03] Ann: Hi"
+
+def test_vtt_skips_header_blocks_and_identifiers():
+    vtt = ("WEBVTT - meeting\n\nNOTE recorded on Monday\n\nSTYLE\n::cue { color: red }\n\n"
+           "intro\n00:00:01.000 --> 00:00:02.000\n<v Ann Lee>I will send the notes</v>\n\n"
+           "00:00:03.000 --> 00:00:04.000 align:start\n<v Bob>Thanks</v>\n")
+    assert parsers.parse_transcript(upload("a.vtt", vtt)) == "Ann Lee: I will send the notes\nBob: Thanks"
+
+def test_vtt_without_header_falls_back_to_raw_text():
+    assert parsers.parse_transcript(upload("a.vtt", "just some notes\nmore notes\n")) == "just some notes\nmore notes"
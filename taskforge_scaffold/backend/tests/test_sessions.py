@@ -0,0 +1,54 @@
+from conftest import install_backend
+from llm_pool import FakeBackend
+import sessions as sessions_module
+from sessions import Session, SessionStore
+
+def transcript(name: str, lines: int = 3) -> str:
+    return "".join(f"Ann: I will review {name} section {n}\n" for n in range(lines))
+
+def test_small_files_share_one_call_and_edits_resend_only_their_segments(fake_llm):
+    backend = install_backend(FakeBackend())
+    session = Session([(f"f{n}.txt", transcript(f"f{n}")) for n in range(20)], [])
+    tasks = session.extract()
+    assert backend.calls == 1
+    assert len(tasks) == 60
+
+    session.edit_files({"f7.txt": transcript("f7") + "Bob: I will book the room\n"})
+    tasks = session.extract()
+    assert session.last_reanalyzed == 2 # The group without f7, and f7 on its own
+    assert any(task["item"] == "Book the room" for task in tasks)
+
+    session.edit_files({"f7.txt": transcript("f7") + "Bob: I will book the hall\n"})
+    session.extract()
+    assert session.last_reanalyzed == 1
+
+def test_unchanged_edit_and_rules(fake_llm):
+    backend = install_backend(FakeBackend())
+    session = Session([("a.txt", transcript("a")), ("b.txt", transcript("b"))], [])
+    session.extract()
+    session.edit_files({"a.txt": transcript("a")})
+    session.extract()
+    assert session.last_reanalyzed == 0
+    session.rules = "Only tasks for Ann"
+    session.extract()
+    assert session.last_reanalyzed == 1
+    assert backend.calls == 2
+
+def test_store_evicts_least_recently_used_beyond_the_character_cap():
+    store = SessionStore(max_chars=250)
+    first = store.create([("a.txt", "x" * 100)], [])
+    second = store.create([("b.txt", "x" * 100)], [])
+    assert store.get(first.id) is first # Now the most recently used
+    third = store.create([("c.txt", "x" * 100)], [])
+    assert store.get(second.id) is None
+    assert store.total_chars() == 200
+    third.edit_files({"c.txt": "x" * 1000})
+    assert store.get(third.id) is third # The session in use is kept even over the cap
+    assert len(store) == 1
+
+def test_store_evicts_by_count_and_age(monkeypatch):
+    store = SessionStore(ttl=60, max_sessions=2)
+    sessions = [store.create([(f"{n}.txt", "text")], []) for n in range(3)]
+    assert store.get(sessions[0].id) is None and len(store) == 2
+    monkeypatch.setattr(sessions_module.time, "time", lambda: sessions[2].updated_at + 61)
+    assert store.get(sessions[2].id) is None
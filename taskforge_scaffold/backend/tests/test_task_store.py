@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import make_task
+from task_store import TaskStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    store.save_meeting([
+        make_task("Send the budget report", "Alice Johnson", dueDate="2026-03-01"),
+        make_task("Book the offsite venue", "Bob Smith", status="Done", dueDate="TBD"),
+        make_task("Review budgeting tool", "alice johnson", dueDate="2026-04-15"),
+    ], title="Planning", source_files=["planning.txt"])
+    return store
+
+def items(result):
+    return sorted(task["item"] for task in result["tasks"])
+
+def test_search_matches_word_prefixes(store):
+    assert items(store.query_tasks(search="budg")) == ["Review budgeting tool", "Send the budget report"]
+    assert items(store.query_tasks(search="venue offsite")) == ["Book the offsite venue"]
+
+def test_search_input_cannot_inject_fts_syntax(store):
+    assert store.query_tasks(search='budget" OR item:*')["total"] == 0
+    assert store.query_tasks(search='"budget')["total"] == 2
+    assert store.query_tasks(search="***")["total"] == 3 # No search terms at all
+
+def test_filters(store):
+    assert store.query_tasks(assignee="ALICE JOHNSON")["total"] == 2
+    assert items(store.query_tasks(open_only=True)) == ["Review budgeting tool", "Send the budget report"]
+    assert items(store.query_tasks(due_after="2026-03-02")) == ["Review budgeting tool"]
+    assert store.query_tasks(due_before="2026-12-31")["total"] == 2 # "TBD" is not a date
+    page = store.query_tasks(page=2, page_size=2)
+    assert (page["total"], len(page["tasks"])) == (3, 1)
+
+def test_replace_tasks(store):
+    meeting_id = store.list_meetings()["meetings"][0]["id"]
+    assert store.replace_tasks(meeting_id, [make_task("Draft the memo", "Carol")])
+    assert items(store.query_tasks(meeting_id=meeting_id)) == ["Draft the memo"]
+    assert store.query_tasks(search="budget")["total"] == 0
+    assert not store.replace_tasks(meeting_id + 1, [])
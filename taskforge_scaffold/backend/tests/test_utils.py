@@ -0,0 +1,57 @@
+from utils import JSONArrayStreamParser, TaskDeduper, dedupe_tasks
+
+def feed_all(parser, pieces):
+    return [task for piece in pieces for task in parser.feed(piece)]
+
+def test_stream_parser_yields_objects_as_they_close():
+    text = '```json\n[{"item": "a {b}", "q": "say \\"hi\\""}, {"item": "c", "n": {"x": [1]}}]\n```'
+    parser = JSONArrayStreamParser()
+    tasks = feed_all(parser, [text[i:i + 7] for i in range(0, len(text), 7)])
+    assert tasks == [{"item": "a {b}", "q": 'say "hi"'}, {"item": "c", "n": {"x": [1]}}]
+    assert parser.finished and not parser.errors
+
+def test_stream_parser_skips_bracketed_preamble():
+    parser = JSONArrayStreamParser()
+    tasks = parser.feed('Here are the tasks [2 found]: [{"item": "a"}, {"item": "b"}]')
+    assert [task["item"] for task in tasks] == ["a", "b"]
+    assert parser.finished and not parser.errors
+
+def test_stream_parser_empty_array_is_finished():
+    parser = JSONArrayStreamParser()
+    assert parser.feed("[ ]") == []
+    assert parser.finished
+
+def test_stream_parser_truncated_reply_is_not_finished():
+    parser = JSONArrayStreamParser()
+    tasks = parser.feed('[{"item": "a"}, {"item": "b", "desc')
+    assert tasks == [{"item": "a"}]
+    assert parser.started and not parser.finished
+
+def test_stream_parser_reports_bad_elements():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"item": "a",}, {"item": "b"}]') == [{"item": "b"}]
+    assert len(parser.errors) == 1
+    stray = JSONArrayStreamParser()
+    stray.feed('[{"item": "a"} oops]')
+    assert stray.finished and stray.errors
+
+def test_deduper_exact_and_near_duplicates():
+    deduper = TaskDeduper()
+    assert deduper.add("Send the Q3 budget report to finance by Friday")
+    assert not deduper.add("send the q3 budget report to finance, by friday!")
+    assert not deduper.add("Send the Q3 budget report to finance by Friday please")
+    assert deduper.add("Book the venue for the offsite")
+
+def test_dedupe_tasks_keeps_first_and_malformed():
+    tasks = [{"item": "Draft the agenda", "id": 1}, {"item": "draft the agenda.", "id": 2}, {"item": None}, "bad"]
+    assert dedupe_tasks(tasks) == [{"item": "Draft the agenda", "id": 1}, {"item": None}, "bad"]
+
+def test_deduper_bounds_candidates_per_item():
+    deduper = TaskDeduper(max_candidates=4)
+    for number in range(50):
+        deduper.add(f"review the quarterly budget deck with finance item{number}")
+    tokens = frozenset("review the quarterly budget deck with finance other".split())
+    ordered = sorted(tokens, key=deduper._token_order)
+    candidates = list(deduper._candidates(ordered[:3], range(7, 10)))
+    assert len(candidates) == 4
+    assert candidates == sorted(candidates, reverse=True) # Newest first
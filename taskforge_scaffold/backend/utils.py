@@ -1,5 +1,8 @@
 import sqlite3
 import json
+import math
+from collections import Counter
+import re
 
 PRIORITY_CLR = {"High":"B31337","Medium":"B5A72E","Low":"3DB14A"}
 STATUS_CLR = {"Stuck":"B31337","Working on it":"F0A43D","Waiting for review":"3D7FF0","Done":"3DB14A"}
@@ -7,6 +10,180 @@ STATUS_CLR = {"Stuck":"B31337","Working on it":"F0A43D","Waiting for review":"3D
 def parse_json(s: str) -> list:
     return json.loads(s)
 
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a JSON array of objects arriving in pieces (e.g. streamed LLM output).
+    feed() returns the objects completed by that piece as soon as their closing brace arrives.
+    Text before the opening '[' (preamble, markdown fences) is ignored, including bracketed
+    preamble such as "[2 found]": an array whose first element is not an object is skipped.
+    The array is complete only once `finished` is set by its closing ']'.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.errors = [] # Elements that closed but were not valid JSON, or stray text between elements
+        self._elements = 0 # Elements read so far, valid or not
+        self._depth = 0 # Nesting depth inside the top-level array
+        self._in_string = False
+        self._escape = False
+        self._pending = [] # Pieces of the element currently being read
+
+    def feed(self, text: str) -> list:
+        completed = []
+        if self.finished:
+            return completed
+        element_start = 0 if self._pending else None
+        for index, char in enumerate(text):
+            if not self.started:
+                if char == '[':
+                    self.started = True
+                continue
+            if self._depth == 0:
+                # Between elements of the top-level array
+                if char == '{':
+                    element_start = index
+                    self._pending = []
+                    self._depth = 1
+                elif char == ']':
+                    self.finished = True
+                    break
+                elif char == ',' or char.isspace():
+                    continue
+                elif not self._elements:
+                    self.started = False # Not an array of objects: keep looking for the real one
+                else:
+                    self.errors.append(f"Unexpected {char!r} after element {self._elements}")
+                    self.finished = True
+                    break
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pending.append(text[element_start:index + 1])
+                    element = "".join(self._pending)
+                    self._pending = []
+                    element_start = None
+                    self._elements += 1
+                    try:
+                        completed.append(json.loads(element))
+                    except json.JSONDecodeError as e:
+                        self.errors.append(f"{e}: {element[:100]}")
+        if element_start is not None and self._depth > 0:
+            self._pending.append(text[element_start:])
+        return completed
+
+# Token-set Jaccard similarity at or above which two task items count as duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# Most earlier items compared with each new one. Keeps de-duplication linear when a small,
+# repetitive vocabulary makes every prefix token common; the newest candidates are checked first
+NEAR_DUPLICATE_MAX_CANDIDATES = 16
+
+_ITEM_PUNCTUATION_RE = re.compile(r'[^\w\s-]') # Keep word chars, whitespace, hyphen
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_task_item(item_text):
+    """Helper function to normalize task item text for de-duplication."""
+    if not item_text:
+        return ""
+    # Lowercase, remove punctuation (except maybe hyphens if needed), collapse whitespace
+    text = _ITEM_PUNCTUATION_RE.sub('', item_text.lower())
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+class TaskDeduper:
+    """
+    Incremental duplicate detector for task items.
+    Exact duplicates are caught by normalized text. Near duplicates (token-set Jaccard
+    similarity >= threshold) are found with prefix filtering: each item's tokens are put in one
+    fixed order and only the first len - ceil(threshold * len) + 1 of them are indexed, since two
+    sets that similar must share one of those tokens. Ordering rare tokens first (when
+    `token_frequencies` are known, as in dedupe_tasks) keeps each candidate list to a few items
+    instead of every item seen so far; otherwise tokens are ordered by hash. At most
+    `max_candidates` earlier items, newest first, are compared with each new one, so a near
+    duplicate may be missed only when more similar-looking items came between the two.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, token_frequencies: dict = None,
+                 max_candidates: int = NEAR_DUPLICATE_MAX_CANDIDATES):
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self._token_frequencies = token_frequencies or {}
+        self._exact = set()
+        self._token_sets = []
+        self._prefix_index = {} # (token, set size) -> ids of token sets with that token in their prefix
+
+    def _token_order(self, token):
+        return (self._token_frequencies.get(token, 0), hash(token))
+
+    def add(self, item_text: str) -> bool:
+        """Records item_text. Returns False if it duplicates an item already added."""
+        return self.add_normalized(normalize_task_item(item_text))
+
+    def add_normalized(self, normalized_item: str) -> bool:
+        """Like add(), for text already passed through normalize_task_item."""
+        if not normalized_item:
+            return True
+        if normalized_item in self._exact:
+            return False
+        tokens = frozenset(normalized_item.split(' '))
+        size = len(tokens)
+        ordered = sorted(tokens, key=self._token_order)
+        prefix = ordered[:size - math.ceil(self.threshold * size) + 1]
+        if self.threshold < 1:
+            # Length filter: Jaccard >= t requires t * |a| <= |b| <= |a| / t
+            sizes = range(math.ceil(self.threshold * size - 1e-9), int(size / self.threshold + 1e-9) + 1)
+            for candidate_id in self._candidates(prefix, sizes):
+                candidate = self._token_sets[candidate_id]
+                overlap = len(tokens & candidate)
+                if overlap >= self.threshold * (size + len(candidate) - overlap):
+                    return False
+        self._exact.add(normalized_item)
+        token_set_id = len(self._token_sets)
+        self._token_sets.append(tokens)
+        for token in prefix:
+            self._prefix_index.setdefault((token, size), []).append(token_set_id)
+        return True
+
+    def _candidates(self, prefix: list, sizes: range):
+        # Distinct ids sharing a prefix token, from the buckets of compatible sizes, newest first
+        seen = set()
+        for token in prefix:
+            for size in sizes:
+                for candidate_id in reversed(self._prefix_index.get((token, size), ())):
+                    if candidate_id in seen:
+                        continue
+                    if len(seen) >= self.max_candidates:
+                        return
+                    seen.add(candidate_id)
+                    yield candidate_id
+
+def dedupe_tasks(tasks: list, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> list:
+    """Drops tasks whose `item` duplicates (or nearly duplicates) an earlier task, keeping the first occurrence."""
+    normalized_items = [
+        normalize_task_item(task['item']) if isinstance(task, dict) and isinstance(task.get('item'), str) else None
+        for task in tasks
+    ]
+    token_frequencies = Counter()
+    for normalized_item in set(normalized_items):
+        if normalized_item:
+            token_frequencies.update(set(normalized_item.split(' ')))
+    deduper = TaskDeduper(threshold, token_frequencies)
+    # Malformed entries (no string item) are kept for validation to report
+    return [task for task, normalized_item in zip(tasks, normalized_items)
+            if normalized_item is None or deduper.add_normalized(normalized_item)]
+
 def sanitize_tasks(raw: list) -> list:
     # Deduplicate, infer dates/priorities
     return raw
@@ -18,6 +195,7 @@ def load_prompt_template() -> str:
 def group_by_owner(tasks: list) -> dict:
     groups = {}
     for t in tasks:
-        owner = t.get("Assignee", "Unassigned")
+        # TaskModel uses "assignee"; "Assignee" is kept for older task dicts
+        owner = t.get("assignee") or t.get("Assignee") or "Unassigned"
         groups.setdefault(owner, []).append(t)
     return groups